@@ -0,0 +1,121 @@
+"""
+Reference‑drawing upload pipeline.
+
+• The upload is streamed to a temporary file in chunks, hashed on the way,
+  and refused as soon as it passes DRAWING_MAX_BYTES.
+• Pillow then writes compressed, downscaled WebP variants once – one per
+  width in DRAWING_WIDTHS that is smaller than the image – named after the
+  content hash (``drawing-<sha256[:16]>-<width>.webp``).
+• Because a name never changes content, the files are served with
+  ``Cache-Control: public, max-age=31536000, immutable`` and the page picks
+  the right one with srcset: a contest‑start burst costs each browser one
+  small image instead of the original photo.
+
+Configuration (environment or .env):
+    DRAWING_MAX_BYTES   largest accepted upload (default 25 MB)
+    DRAWING_WIDTHS      variant widths in px (default 500,1000 – 1× and 2× of the page)
+    DRAWING_QUALITY     WebP quality 1‑100 (default 80)
+"""
+
+import hashlib, os, tempfile
+from PIL import Image, ImageOps
+
+MAX_BYTES = int(os.getenv("DRAWING_MAX_BYTES", str(25 * 1024 * 1024)))
+WIDTHS    = tuple(sorted(int(w) for w in os.getenv("DRAWING_WIDTHS", "500,1000").split(",")))
+QUALITY   = int(os.getenv("DRAWING_QUALITY", "80"))
+CHUNK     = 64 * 1024
+PREFIX    = "drawing-"
+
+
+class UploadError(ValueError):
+    """The upload was refused; the message is safe to show to the user."""
+
+
+def receive(stream, folder: str, max_bytes: int = MAX_BYTES) -> tuple:
+    """Copy ``stream`` into a temp file in ``folder`` → (path, sha256 hex)."""
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size   = 0
+    fd, path = tempfile.mkstemp(prefix=".upload-", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Drawing is too large (max {max_bytes // (1024 * 1024)} MB).")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    if size == 0:
+        os.unlink(path)
+        raise UploadError("No file selected.")
+    return path, digest.hexdigest()
+
+
+def make_variants(source: str, digest: str, folder: str,
+                  widths: tuple = WIDTHS, quality: int = QUALITY) -> list:
+    """Write the WebP variants of ``source`` → ``[(filename, width, height), ...]``, smallest first.
+
+    Widths at or above the image's own width collapse into one full‑width
+    variant, so nothing is ever upscaled.
+    """
+    try:
+        with Image.open(source) as img:
+            # JPEG can decode straight at a fraction of the size – much
+            # faster for a 20 MB phone photo
+            img.draft("RGB", (max(widths), max(widths)))
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+            img.load()
+    except (OSError, Image.DecompressionBombError, ValueError):
+        raise UploadError("That file is not a readable image.")
+
+    variants = []
+    for width in sorted({min(w, img.width) for w in widths}):
+        height  = max(1, round(img.height * width / img.width))
+        name    = f"{PREFIX}{digest[:16]}-{width}.webp"
+        target  = os.path.join(folder, name)
+        if not os.path.exists(target):              # same content → already there
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            tmp = target + ".tmp"
+            resized.save(tmp, "WEBP", quality=quality, method=4)
+            os.replace(tmp, target)
+        variants.append((name, width, height))
+    return variants
+
+
+def remove_old(folder: str, keep: list) -> None:
+    """Delete variants of earlier drawings (anything not in ``keep``)."""
+    keep = set(keep)
+    for name in os.listdir(folder):
+        if name.startswith(PREFIX) and name not in keep:
+            try:
+                os.unlink(os.path.join(folder, name))
+            except OSError:
+                pass
+
+
+def process_upload(stream, folder: str, max_bytes: int = MAX_BYTES) -> dict:
+    """Whole pipeline → the contest settings to store for the new drawing.
+
+    ``{"drawing_file": smallest variant, "drawing_srcset": "<file> <w>w, …",
+    "drawing_size": "<w>x<h>" of the smallest variant}``
+    """
+    path, digest = receive(stream, folder, max_bytes)
+    try:
+        variants = make_variants(path, digest, folder)
+    finally:
+        os.unlink(path)                             # the original is never served
+    remove_old(folder, [name for name, _, _ in variants])
+
+    name, width, height = variants[0]
+    return {
+        "drawing_file":   name,
+        "drawing_srcset": ", ".join(f"{n} {w}w" for n, w, _ in variants),
+        "drawing_size":   f"{width}x{height}",
+    }
@@ -0,0 +1,138 @@
+"""
+Server‑Sent Events for the contest page.
+
+One Broadcaster per process keeps a short ring buffer of events and a single
+Condition that every open /events stream waits on – publishing is O(1) no
+matter how many participants are connected.  A single pump thread per
+process watches Contest_State and publishes:
+
+    contest   – start / end, with the server's remaining seconds (also re‑sent
+                every TICK_SECONDS so client clocks can't drift)
+    verdict   – a participant's evaluation result, only to that participant
+
+Streams are plain generators blocked on the shared Condition, so run the
+evaluator on an async worker (``gunicorn -k gevent …``, gevent is in
+requirements.txt) to have each open connection cost a greenlet instead of an
+OS thread; the worker's monkey‑patching turns the Condition, the pump and
+the grading threads into greenlets too.  On a sync worker one open page
+would occupy the whole worker, so there streaming_ok() is False, /events
+answers 204 (EventSource then stops reconnecting) and the page polls /result
+for its verdict instead.
+
+Tuning (environment or .env):
+    EVENTS_POLL_SECONDS   how often the pump checks the state store (default 0.5)
+    EVENTS_TICK_SECONDS   remaining‑time re‑sync interval (default 15)
+"""
+
+import os, json, threading, time
+from collections import deque
+from datetime import datetime
+
+POLL_SECONDS      = float(os.getenv("EVENTS_POLL_SECONDS", "0.5"))
+TICK_SECONDS      = float(os.getenv("EVENTS_TICK_SECONDS", "15"))
+KEEPALIVE_SECONDS = 15.0
+BUFFER_SIZE       = 1000
+
+
+def contest_event(settings: dict) -> dict:
+    end = settings["contest_end"]
+    remaining = (end - datetime.utcnow()).total_seconds() if end is not None else 0
+    return {
+        "running":           remaining > 0,
+        "remaining_seconds": max(0, int(remaining)),
+        "contest_end":       end.isoformat() + "Z" if end is not None else None,
+    }
+
+
+def streaming_ok(environ) -> bool:
+    """Can this server keep an /events connection open without starving the
+    other requests?  Yes on gevent or a threaded server, no on a sync worker."""
+    if environ.get("wsgi.multithread"):
+        return True
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def _format(seq: int, name: str, data: dict) -> str:
+    return f"id: {seq}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class Broadcaster:
+    def __init__(self, store, poll_seconds: float = POLL_SECONDS,
+                 tick_seconds: float = TICK_SECONDS):
+        self.store   = store
+        self.poll    = poll_seconds
+        self.tick    = tick_seconds
+        self._events = deque(maxlen=BUFFER_SIZE)    # (seq, participant | None, name, data)
+        self._seq    = 0
+        self._cond   = threading.Condition()
+        self._pump   = None
+        self._pump_lock = threading.Lock()
+
+    def publish(self, name: str, data: dict, participant: str = None) -> None:
+        """Queue an event for everybody, or only for ``participant``."""
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, participant, name, data))
+            self._cond.notify_all()
+
+    def stream(self, participant: str):
+        """SSE text for one connection: a contest snapshot, then live events."""
+        self._ensure_pump()
+        with self._cond:
+            cursor = self._seq
+        yield "retry: 3000\n\n"
+        yield _format(cursor, "contest", contest_event(self.store.contest()))
+
+        while True:
+            with self._cond:
+                if self._seq == cursor:
+                    self._cond.wait(KEEPALIVE_SECONDS)
+                pending = [e for e in self._events if e[0] > cursor]
+                cursor  = self._seq
+            if not pending:
+                yield ": keep-alive\n\n"
+                continue
+            for seq, target, name, data in pending:
+                if target is None or target == participant:
+                    yield _format(seq, name, data)
+
+    # pump ------------------------------------------------------------------
+
+    def _ensure_pump(self):
+        with self._pump_lock:
+            if self._pump is None:
+                self._pump = threading.Thread(target=self._run_pump, daemon=True,
+                                              name="contest-events")
+                self._pump.start()
+
+    def _run_pump(self):
+        cursor    = self.store.latest_seq()         # only verdicts from now on
+        last      = None                            # first pass always publishes
+        last_tick = time.monotonic()
+
+        while True:
+            time.sleep(self.poll)
+            try:
+                state = contest_event(self.store.contest())
+                now   = time.monotonic()
+                changed = last is None or \
+                    (state["running"], state["contest_end"]) != (last["running"], last["contest_end"])
+                if changed or (state["running"] and now - last_tick >= self.tick):
+                    self.publish("contest", state)
+                    last_tick = now
+                last = state
+
+                for seq, record in self.store.finished_since(cursor):
+                    cursor = seq
+                    self.publish("verdict", {
+                        "id":     record["id"],
+                        "status": record["status"],
+                        "result": record["result"],
+                        "error":  record["error"],
+                    }, participant=record["participant"])
+            except Exception:
+                pass                                # keep pumping; the store may be busy
@@ -0,0 +1,297 @@
+"""
+Vectorised grading engine.
+
+Solutions and submissions are rows of (volume mm³, mass g, cx, cy, cz mm) in
+NumPy arrays, so checking one submission and re‑grading every stored one
+after a reference value is corrected are the same single pass.
+
+A field passes when ``|submitted − solution| < max(abs_tol, rel_tol·|solution|)``;
+tolerances are per problem and per field.  With the defaults (abs 1e‑4,
+rel 0) that is exactly the original evaluate() check.
+
+    engine = GradingEngine()
+    engine.add_problem("bracket", SOLUTION)
+    result = engine.grade(["bracket"] * n, values)          # values: (n, 5)
+    result.ok, result.deltas, result.score
+
+A solution may have several bodies (a list of SOLUTION dicts).  match()
+pairs the submitted parts with them whatever order Onshape lists the parts
+in: a cost matrix of every part against every body is built in one
+broadcast, and a minimum‑cost assignment (assign(), Hungarian method) picks
+the pairing – a pairing where every field passes always wins over one where
+any field fails.  For a near‑match (the usual submission) ten bodies take
+about half a millisecond and forty about two; parts unrelated to the
+solution make the augmenting paths longer – roughly 1–2 ms for ten bodies,
+7–25 ms for forty.
+
+regrade_store() re‑grades everything a Contest_State store has kept, e.g.
+after fixing a reference value – single‑body problems in one grade() call.
+
+check_parts() and check_box() are the cheap pre‑checks run before mass
+properties are fetched: the part count, and conditions on the model's
+bounding box that follow from the solution alone (it has to hold the largest
+body's volume and contain every body's centroid).  A box that is too large
+never fails them, so a loose box can't reject a correct model.  Submissions
+they cut keep the part count and box, so regrade_store() re‑runs them too.
+"""
+
+import threading
+import numpy as np
+
+FIELDS = ("volume", "mass", "cx", "cy", "cz")
+
+# added to the cost of a part/body pair with a field out of tolerance – more
+# than any pairing of in‑tolerance pairs can cost
+MISMATCH = 1e6
+
+
+def solution_vector(solution: dict) -> np.ndarray:
+    """``{"volume", "mass", "centroid": [x, y, z]}`` (the SOLUTION format) → (5,) array."""
+    return np.array([solution["volume"], solution["mass"], *solution["centroid"]], dtype=float)
+
+
+def solution_matrix(solution) -> np.ndarray:
+    """One SOLUTION dict, a list of them, or (5,) / (k, 5) numbers → (k, 5) array."""
+    if isinstance(solution, dict):
+        return solution_vector(solution)[None, :]
+    if len(solution) and isinstance(solution[0], dict):
+        return np.stack([solution_vector(body) for body in solution])
+    return np.asarray(solution, dtype=float).reshape(-1, len(FIELDS))
+
+
+def _per_field(tol) -> np.ndarray:
+    """Scalar, (5,) sequence or {field: value} → (5,) array."""
+    if isinstance(tol, dict):
+        return np.array([tol.get(f, 0.0) for f in FIELDS], dtype=float)
+    return np.broadcast_to(np.asarray(tol, dtype=float), (len(FIELDS),)).copy()
+
+
+def _score(deltas, solution):
+    """Closeness over the last axis: relative volume + mass error, centroid
+    distance (L1) relative to its size.  0 = perfect."""
+    absd   = np.abs(deltas)
+    scale  = np.maximum(np.abs(solution[..., :2]), 1e-9)
+    c_size = np.maximum(np.abs(solution[..., 2:]).sum(axis=-1), 1.0)
+    return (absd[..., :2] / scale).sum(axis=-1) + absd[..., 2:].sum(axis=-1) / c_size
+
+
+def assign(cost) -> tuple:
+    """Minimum‑cost assignment for an (n, m) cost matrix → ``(rows, cols)``.
+
+    Every row is paired with a distinct column (or every column with a
+    distinct row, when there are more rows than columns); the pairs are
+    returned sorted by row, like scipy's linear_sum_assignment.  Shortest
+    augmenting paths with row/column potentials, O(n²·m), the inner loop
+    over columns vectorised.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    u   = np.zeros(n + 1)                           # row potentials (1‑based)
+    v   = np.zeros(m + 1)                           # column potentials
+    p   = np.zeros(m + 1, dtype=np.intp)            # p[j]: row matched to column j, 0 = none
+    way = np.zeros(m + 1, dtype=np.intp)
+    for i in range(1, n + 1):
+        p[0], j0 = i, 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            free   = ~used[1:]
+            reduced = cost[p[j0] - 1] - u[p[j0]] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better]  = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1    = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used]    -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:                                   # flip the augmenting path
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+class GradeResult:
+    __slots__ = ("deltas", "within", "ok", "score")
+
+    def __init__(self, deltas, within, ok, score):
+        self.deltas = deltas                        # (n, 5) submitted − solution
+        self.within = within                        # (n, 5) bool, per field
+        self.ok     = ok                            # (n,)  bool, every field within
+        self.score  = score                         # (n,)  closeness, 0 = perfect
+
+
+class MatchResult:
+    __slots__ = ("body", "deltas", "within", "ok", "score")
+
+    def __init__(self, body, deltas, within, ok, score):
+        self.body   = body                          # (m,)   solution body per part, −1 = none
+        self.deltas = deltas                        # (m, 5) part − its body (NaN if none)
+        self.within = within                        # (m, 5) bool, per field
+        self.ok     = ok                            # every part matched and within
+        self.score  = score                         # summed pair scores + 1 per unpaired body/part
+
+
+class GradingEngine:
+    def __init__(self):
+        self._names    = {}                         # problem name → (first row, body count)
+        self._solution = np.empty((0, len(FIELDS)))
+        self._abs_tol  = np.empty((0, len(FIELDS)))
+        self._rel_tol  = np.empty((0, len(FIELDS)))
+        self._lock     = threading.Lock()
+
+    @property
+    def problems(self) -> list:
+        return list(self._names)
+
+    def bodies(self, problem: str) -> int:
+        return self._names[problem][1]
+
+    def add_problem(self, name: str, solution, abs_tol=1e-4, rel_tol=0.0) -> None:
+        """Add (or replace) a problem.
+
+        ``solution`` is a SOLUTION dict, a list of them (one per body) or
+        (5,) / (k, 5) numbers; the tolerances apply to every body.
+        """
+        matrix = solution_matrix(solution)
+        k      = len(matrix)
+        with self._lock:
+            start, count = self._names.get(name, (None, 0))
+            if count != k:                          # new, or a different body count: new rows
+                start = len(self._solution)
+                self._solution = np.vstack([self._solution, matrix])
+                self._abs_tol  = np.vstack([self._abs_tol, np.tile(_per_field(abs_tol), (k, 1))])
+                self._rel_tol  = np.vstack([self._rel_tol, np.tile(_per_field(rel_tol), (k, 1))])
+                self._names[name] = (start, k)
+            else:
+                self._solution[start:start + k] = matrix
+                self._abs_tol[start:start + k]  = _per_field(abs_tol)
+                self._rel_tol[start:start + k]  = _per_field(rel_tol)
+
+    def _rows(self, problem: str) -> tuple:
+        """(solution (k, 5), tolerance (k, 5)) of one problem."""
+        start, k = self._names[problem]
+        with self._lock:
+            solution = self._solution[start:start + k].copy()
+            tol      = np.maximum(self._abs_tol[start:start + k],
+                                  self._rel_tol[start:start + k] * np.abs(solution))
+        return solution, tol
+
+    def problem_index(self, problems) -> np.ndarray:
+        return np.fromiter((self._names[p][0] for p in problems), dtype=np.intp)
+
+    def grade(self, problems, values) -> GradeResult:
+        """Grade ``values`` (n, 5) against single‑body ``problems`` (n names or row indices)."""
+        values = np.asarray(values, dtype=float).reshape(-1, len(FIELDS))
+        rows   = problems if isinstance(problems, np.ndarray) and problems.dtype.kind == "i" \
+            else self.problem_index(problems)
+
+        with self._lock:
+            solution = self._solution[rows]
+            tol      = np.maximum(self._abs_tol[rows], self._rel_tol[rows] * np.abs(solution))
+
+        deltas = values - solution
+        within = np.abs(deltas) < tol
+        ok     = within.all(axis=1)
+        return GradeResult(deltas, within, ok, _score(deltas, solution))
+
+    def match(self, problem: str, values) -> MatchResult:
+        """Pair the submitted parts ``values`` (m, 5) with ``problem``'s bodies and grade them."""
+        values        = np.asarray(values, dtype=float).reshape(-1, len(FIELDS))
+        solution, tol = self._rows(problem)
+
+        pair_deltas = values[:, None, :] - solution[None, :, :]        # (m, k, 5)
+        pair_within = np.abs(pair_deltas) < tol[None, :, :]
+        pair_score  = _score(pair_deltas, solution[None, :, :])         # (m, k)
+        rows, cols  = assign(pair_score + MISMATCH * ~pair_within.all(axis=2))
+
+        m, k   = len(values), len(solution)
+        body   = np.full(m, -1, dtype=np.intp)
+        deltas = np.full((m, len(FIELDS)), np.nan)
+        within = np.zeros((m, len(FIELDS)), dtype=bool)
+        body[rows], deltas[rows], within[rows] = cols, pair_deltas[rows, cols], pair_within[rows, cols]
+
+        ok    = m == k and bool(within.all())
+        score = float(pair_score[rows, cols].sum()) + abs(m - k)
+        return MatchResult(body, deltas, within, ok, score)
+
+    def check_parts(self, problem: str, count: int):
+        """None if a model with ``count`` parts could match ``problem``, else the reason it can't."""
+        k = self.bodies(problem)
+        if count != k:
+            return f"The model should have {k} part{'s' if k != 1 else ''}, this one has {count}."
+        return None
+
+    def check_box(self, problem: str, low, high):
+        """None if a model with bounding box ``low``–``high`` (mm) could match
+        ``problem``, else the reason it can't."""
+        low, high     = np.asarray(low, dtype=float), np.asarray(high, dtype=float)
+        solution, tol = self._rows(problem)
+
+        largest = np.argmax(solution[:, 0])
+        if np.prod(np.maximum(high - low, 0.0)) < solution[largest, 0] - tol[largest, 0]:
+            return "The model is too small – its bounding box can't hold the expected volume."
+        centroids, c_tol = solution[:, 2:], tol[:, 2:]
+        if np.any(centroids < low - c_tol) or np.any(centroids > high + c_tol):
+            return ("The model is in the wrong place – the expected centre of mass "
+                    "lies outside its bounding box.")
+        return None
+
+
+def regrade_store(engine: GradingEngine, store, default_problem: str) -> tuple:
+    """Re‑grade every submission in a Contest_State store.
+
+    Returns ``(how many were re‑graded, ids to measure)``: submissions a
+    pre‑check cut are checked again from their stored part count and box;
+    those that pass now were never measured, so the caller has to grade them
+    afresh.  Rows saved before problems had names are graded as
+    ``default_problem``; ``measured`` is one row per part (older rows: a
+    single flat row).
+    """
+    graded = store.graded_submissions()
+    if not graded:
+        return 0, []
+
+    single, multi, grades, unmeasured = [], [], [], []
+    for sid, problem, measured, checks in graded:
+        problem = problem or default_problem
+        if measured is None:
+            box    = checks.get("box")
+            reason = engine.check_parts(problem, checks["parts"]) \
+                or (engine.check_box(problem, *box) if box is not None else None)
+            if reason:
+                grades.append((sid, False, None))
+            else:
+                unmeasured.append(sid)
+            continue
+        values  = np.asarray(measured, dtype=float).reshape(-1, len(FIELDS))
+        if len(values) == 1 and engine.bodies(problem) == 1:
+            single.append((sid, problem, values[0]))
+        else:
+            multi.append((sid, problem, values))
+
+    if single:
+        result = engine.grade([problem for _, problem, _ in single],
+                              [values for _, _, values in single])
+        grades.extend(zip([sid for sid, _, _ in single], result.ok.tolist(), result.score.tolist()))
+    for sid, problem, values in multi:
+        result = engine.match(problem, values)
+        grades.append((sid, result.ok, result.score))
+    store.update_grades(grades)
+    return len(grades), unmeasured
@@ -0,0 +1,126 @@
+"""
+In‑process job queue for contest submissions.
+
+/evaluate only validates and enqueues; a fixed pool of worker threads does
+the Onshape calls.  Each job is stamped with the moment it was *accepted*,
+so a submission that is still being graded when the clock runs out counts.
+Jobs are not kept once finished – on_accept/on_done persist them (the
+evaluator writes them to Contest_State, which /result reads).  Passing
+``job_id`` / ``accepted_at`` to submit() runs a stored submission again under
+its own id and acceptance time (a re‑grade).
+
+Tuning (environment or .env):
+    EVAL_WORKERS      worker threads (default 8)
+    EVAL_QUEUE_MAX    queued jobs before new submissions are refused (default 200)
+"""
+
+import os, queue, threading, time, uuid
+from datetime import datetime
+
+WORKERS   = int(os.getenv("EVAL_WORKERS", "8"))
+QUEUE_MAX = int(os.getenv("EVAL_QUEUE_MAX", "200"))
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the backlog is at EVAL_QUEUE_MAX."""
+
+
+class Job:
+    __slots__ = ("id", "owner", "meta", "args", "accepted_at", "status", "result", "error",
+                 "_queued", "_started", "_finished", "_fn")
+
+    def __init__(self, fn, args, owner=None, meta=None, job_id=None, accepted_at=None):
+        self.id          = job_id or uuid.uuid4().hex
+        self.owner       = owner                    # e.g. participant cookie
+        self.meta        = meta or {}               # caller's extra bookkeeping
+        self.args        = args
+        self.accepted_at = accepted_at or datetime.utcnow()   # what the contest cutoff looks at
+        self.status      = "queued"                 # queued → running → done | failed
+        self.result      = None
+        self.error       = None
+        self._queued     = time.perf_counter()
+        self._started    = None
+        self._finished   = None
+        self._fn         = fn
+
+    @property
+    def wait_seconds(self):
+        end = self._started if self._started is not None else time.perf_counter()
+        return end - self._queued
+
+    @property
+    def run_seconds(self):
+        if self._started is None:
+            return None
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    def to_dict(self) -> dict:
+        return {
+            "id":           self.id,
+            "status":       self.status,
+            "accepted_at":  self.accepted_at.isoformat() + "Z",
+            "wait_seconds": round(self.wait_seconds, 4),
+            "run_seconds":  None if self.run_seconds is None else round(self.run_seconds, 4),
+            "result":       self.result,
+            "error":        self.error,
+        }
+
+
+class JobQueue:
+    """Bounded FIFO in front of ``workers`` daemon threads."""
+
+    def __init__(self, workers: int = WORKERS, max_queue: int = QUEUE_MAX,
+                 initializer=None, initargs=(), on_accept=None, on_done=None):
+        self._queue     = queue.Queue(maxsize=max_queue)
+        self._initializer = initializer             # run once per worker, like ThreadPoolExecutor
+        self._initargs  = initargs
+        self._on_accept = on_accept                 # job → None, before it is queued
+        self._on_done   = on_done                   # job → None, on the worker thread
+        self._threads   = [threading.Thread(target=self._work, daemon=True,
+                                            name=f"eval-worker-{i}")
+                           for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, fn, *args, owner=None, meta=None, job_id=None, accepted_at=None) -> Job:
+        if self._queue.full():
+            raise QueueFull("Too many submissions in progress – please retry in a moment.")
+        job = Job(fn, args, owner, meta, job_id, accepted_at)
+        if self._on_accept is not None:
+            self._on_accept(job)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            job.status = "failed"
+            job.error  = "Too many submissions in progress – please retry in a moment."
+            if self._on_done is not None:
+                self._on_done(job)
+            raise QueueFull(job.error)
+        return job
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self):
+        if self._initializer is not None:
+            self._initializer(*self._initargs)
+        while True:
+            job = self._queue.get()
+            job._started = time.perf_counter()
+            job.status   = "running"
+            try:
+                job.result = job._fn(*job.args)
+                job.status = "done"
+            except Exception as exc:
+                job.error  = str(exc)
+                job.status = "failed"
+            finally:
+                job._finished = time.perf_counter()
+                job._fn = None
+                if self._on_done is not None:
+                    try:
+                        self._on_done(job)
+                    except Exception:
+                        pass                        # never kill the worker over bookkeeping
+                self._queue.task_done()
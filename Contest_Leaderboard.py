@@ -0,0 +1,156 @@
+"""
+Live contest leaderboard.
+
+Ranking:
+  1. participants with a perfect match, earliest first (time the winning
+     submission was *accepted*);
+  2. everybody else by their closest attempt (smallest delta score).
+
+Each participant's best entry sits in an ordered skip list, so a new
+submission costs O(log n) – nothing is ever re‑sorted.  Finished submissions
+are read from the Contest_State change feed, so every worker process builds
+the same board no matter which one graded the submission.  Viewers get a
+snapshot cached per board version; refreshing the page doesn't re‑rank.
+After a bulk re‑grade (the store's grades_version changes) the board is
+rebuilt from the whole feed, which by then carries the new grades.
+
+Tuning (environment or .env):
+    LEADERBOARD_REFRESH_SECONDS   min. time between reads of the feed (default 0.5)
+    LEADERBOARD_SIZE              rows in a snapshot (default 100)
+"""
+
+import os, random, threading, time
+
+REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "0.5"))
+SIZE            = int(os.getenv("LEADERBOARD_SIZE", "100"))
+
+
+class _SkipList:
+    """Sorted set of comparable, unique keys; O(log n) expected insert/remove."""
+
+    MAX_LEVEL = 24
+
+    def __init__(self):
+        self._head  = [None] * self.MAX_LEVEL       # forward pointers of the head
+        self._level = 1
+        self._len   = 0
+
+    def _path(self, key):
+        """Last node before ``key`` on every level (None = head)."""
+        update, node = [None] * self.MAX_LEVEL, None
+        for lvl in range(self._level - 1, -1, -1):
+            nxt = (node[1] if node else self._head)[lvl]
+            while nxt is not None and nxt[0] < key:
+                node, nxt = nxt, nxt[1][lvl]
+            update[lvl] = node
+        return update
+
+    def insert(self, key) -> None:
+        update = self._path(key)
+        level  = 1
+        while level < self.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        self._level = max(self._level, level)
+        node = (key, [None] * level)                # (key, forward pointers)
+        for lvl in range(level):
+            prev = update[lvl][1] if update[lvl] else self._head
+            node[1][lvl], prev[lvl] = prev[lvl], node
+        self._len += 1
+
+    def remove(self, key) -> None:
+        update = self._path(key)
+        target = (update[0][1] if update[0] else self._head)[0]
+        if target is None or target[0] != key:
+            raise KeyError(key)
+        for lvl in range(len(target[1])):
+            prev = update[lvl][1] if update[lvl] else self._head
+            if prev[lvl] is target:
+                prev[lvl] = target[1][lvl]
+        self._len -= 1
+
+    def __iter__(self):
+        node = self._head[0]
+        while node is not None:
+            yield node[0]
+            node = node[1][0]
+
+    def __len__(self):
+        return self._len
+
+
+def rank_key(record: dict) -> tuple:
+    """Smaller is better.  Solved entries always sort before unsolved ones."""
+    if record["solved"]:
+        return (0, record["accepted_at"], 0.0, record["participant"])
+    return (1, record["score"], record["accepted_at"], record["participant"])
+
+
+class Leaderboard:
+    def __init__(self, store, refresh_seconds: float = REFRESH_SECONDS, size: int = SIZE):
+        self.store     = store
+        self.refresh_s = refresh_seconds
+        self.size      = size
+        self.version   = 0
+        self._index    = _SkipList()
+        self._best     = {}                         # participant → (key, record)
+        self._cursor   = 0
+        self._grades   = 0                          # store grades_version we ranked
+        self._next_refresh = 0.0
+        self._snapshot = None                       # (version, payload)
+        self._lock     = threading.Lock()
+
+    def record(self, record: dict) -> bool:
+        """Offer one finished submission; True if it changed the board."""
+        if record["status"] != "done" or record["solved"] is None:
+            return False
+        if not record["solved"] and record["score"] is None:
+            return False
+
+        key     = rank_key(record)
+        current = self._best.get(record["participant"])
+        if current is not None:
+            if current[0] <= key:
+                return False                        # not an improvement
+            self._index.remove(current[0])
+        self._index.insert(key)
+        self._best[record["participant"]] = (key, record)
+        self.version += 1
+        return True
+
+    def refresh(self) -> None:
+        """Pull submissions finished since the last call (rate‑limited)."""
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        self._next_refresh = now + self.refresh_s
+        grades = self.store.contest().get("grades_version", 0)
+        if grades != self._grades:
+            self._grades = grades
+            self._index, self._best, self._cursor = _SkipList(), {}, 0
+            self.version += 1
+        for seq, record in self.store.finished_since(self._cursor):
+            self._cursor = seq
+            self.record(record)
+
+    def snapshot(self) -> dict:
+        """Top ``size`` rows; rebuilt only when the board version changed."""
+        with self._lock:
+            self.refresh()
+            if self._snapshot is not None and self._snapshot[0] == self.version:
+                return self._snapshot[1]
+
+            rows = []
+            for rank, key in enumerate(self._index, start=1):
+                if rank > self.size:
+                    break
+                record = self._best[key[-1]][1]
+                rows.append({
+                    "rank":        rank,
+                    "name":        record["name"] or f"Participant {record['participant'][:6]}",
+                    "solved":      record["solved"],
+                    "accepted_at": record["accepted_at"].isoformat() + "Z",
+                    "score":       None if record["solved"] else record["score"],
+                })
+            payload = {"version": self.version, "participants": len(self._index), "rows": rows}
+            self._snapshot = (self.version, payload)
+            return payload
@@ -0,0 +1,274 @@
+"""
+Contest‑burst load generator for the evaluator.
+
+Simulates ``--participants`` people posting Onshape links to /evaluate over
+the last ``--duration`` seconds before the server's contest_end (read from
+GET /contest), most of them in the final minutes, and waits for every
+verdict.  Each participant also holds the page's /events stream open from the
+start of the window to the end of the run, as a browser would.
+
+    # evaluator answering from recorded traffic – no API quota spent; a
+    # 5‑minute contest, so --start opens a contest that ends with the window
+    ONSHAPE_TRAFFIC=replay CONTEST_MINUTES=5 \\
+        gunicorn -w 4 -k gevent -b :5000 Onshape_Model_Evaluator_Flask:app
+    python Contest_Load_Test.py http://127.0.0.1:5000 links.txt \\
+        --participants 150 --duration 300 --curve exponential --start -o load.json
+
+Against a longer contest the generator waits until ``--duration`` seconds are
+left; with fewer left it uses what remains.
+
+Arrival curves over the window [0, duration], ending at contest_end:
+    uniform       the same rate throughout
+    linear        rate grows linearly, peaking at contest_end
+    exponential   rate ∝ exp(t / (tau·duration)) – a late rush (default, tau 0.15)
+
+Each participant submits ``--submissions`` times, with its own participant
+cookie, cycling through the links file (one link per line, #comments
+skipped).  Reported: submissions accepted/rejected by status, verdict
+failures, throughput (overall and busiest 10 s), p50/p95/p99 of the POST
+round trip and of the full POST → verdict time, and how many /events streams
+were held to the end (a sync worker answers 204 – "refused").
+"""
+
+import argparse, json, math, random, sys, threading, time, uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from Onshape_Batch_Evaluate import read_links
+from Onshape_Benchmark import summarize
+
+CURVES = ("uniform", "linear", "exponential")
+
+
+def arrival_times(n: int, duration: float, curve: str, tau: float = 0.15, seed=None) -> list:
+    """``n`` sorted arrival offsets in [0, duration] drawn from the curve (inverse CDF)."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        u = rng.random()
+        if curve == "uniform":
+            x = u
+        elif curve == "linear":                    # density 2x
+            x = math.sqrt(u)
+        else:                                       # density ∝ exp(x / tau) on [0, 1]
+            x = tau * math.log(1 + u * (math.exp(1 / tau) - 1))
+        out.append(x * duration)
+    return sorted(out)
+
+
+class Participant:
+    """One browser: its own cookie jar, so /result only shows its own submissions.
+
+    A Session isn't safe to share between threads, so the /events listener
+    and every submission (they overlap) get one of their own, all with the
+    same participant cookie.
+    """
+
+    def __init__(self, base_url: str, name: str):
+        self.base_url = base_url.rstrip("/")
+        self.name     = name
+        # as if the page had been opened already – otherwise two concurrent
+        # first submissions would each be handed a different participant id
+        self.cookie   = uuid.uuid4().hex
+        self.stream   = {"state": None, "events": Counter()}   # this page's /events stream
+
+    def _session(self) -> requests.Session:
+        session = requests.Session()
+        session.cookies.set("participant", self.cookie)
+        return session
+
+    def listen(self, stop: threading.Event) -> None:
+        """Hold /events open until ``stop`` – run in a daemon thread, it is never closed."""
+        session = self._session()
+        try:
+            # keep‑alives come every 15 s, so a longer silence is a stalled stream
+            res = session.get(f"{self.base_url}/events", stream=True, timeout=(10, 30))
+        except requests.RequestException:
+            self.stream["state"] = "failed"
+            return
+        if res.status_code != 200:
+            self.stream["state"] = "refused" if res.status_code == 204 else "failed"
+            res.close()
+            return
+        self.stream["state"] = "open"
+        try:
+            for line in res.iter_lines(decode_unicode=True):
+                if stop.is_set():
+                    return
+                if line and line.startswith("event: "):
+                    self.stream["events"][line[7:]] += 1
+        except requests.RequestException:
+            pass
+        if not stop.is_set():
+            self.stream["state"] = "dropped"
+
+    def submit(self, link: str, poll: float, timeout: float) -> dict:
+        with self._session() as session:
+            return self._submit(session, link, poll, timeout)
+
+    def _submit(self, session, link: str, poll: float, timeout: float) -> dict:
+        outcome = {"status": None, "post_s": None, "verdict_s": None, "verdict": None}
+        t0 = time.perf_counter()
+        try:
+            res = session.post(f"{self.base_url}/evaluate", data={"link": link, "name": self.name},
+                                    headers={"Accept": "application/json"}, timeout=timeout)
+        except requests.RequestException as exc:
+            outcome["status"] = type(exc).__name__
+            return outcome
+        outcome["post_s"] = time.perf_counter() - t0
+        outcome["status"] = res.status_code
+        if res.status_code != 202:
+            return outcome
+
+        job_id   = res.json()["id"]
+        deadline = t0 + timeout
+        while time.perf_counter() < deadline:
+            time.sleep(poll)
+            try:
+                res = session.get(f"{self.base_url}/result/{job_id}", timeout=timeout)
+                record = res.json()
+            except (requests.RequestException, ValueError):
+                continue
+            if res.status_code == 404:
+                outcome["verdict"] = "lost"
+                return outcome
+            if record.get("status") in ("done", "failed"):
+                outcome["verdict_s"] = time.perf_counter() - t0
+                outcome["verdict"]   = "graded" if record.get("solved") is not None else record["status"]
+                return outcome
+        outcome["verdict"] = "timeout"
+        return outcome
+
+
+def contest_window(base_url: str, duration: float) -> tuple:
+    """(seconds until the window opens, window length) so the window ends at contest_end."""
+    state = requests.get(base_url.rstrip("/") + "/contest", timeout=10).json()
+    if not state["running"]:
+        raise SystemExit("The contest is not running – start it first or pass --start.")
+    remaining = state["remaining_seconds"]
+    return max(0.0, remaining - duration), min(duration, remaining)
+
+
+def wait_running(base_url: str, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while not requests.get(base_url.rstrip("/") + "/contest", timeout=10).json()["running"]:
+        if time.monotonic() > deadline:
+            raise SystemExit("The contest did not start.")
+        time.sleep(0.2)
+
+
+def run(args, links: list) -> dict:
+    lead, duration = contest_window(args.url, args.duration)
+    if lead:
+        print(f"waiting {lead:.0f} s for the last {duration:.0f} s of the contest",
+              file=sys.stderr, flush=True)
+        time.sleep(lead)
+
+    participants = [Participant(args.url, f"load-{i}") for i in range(args.participants)]
+    schedule = arrival_times(args.participants * args.submissions, duration,
+                             args.curve, args.tau, args.seed)
+    # spread every participant's submissions over the window, in random order
+    owners = [p for p in participants for _ in range(args.submissions)]
+    random.Random(args.seed).shuffle(owners)
+
+    outcomes, lock = [], threading.Lock()
+
+    def fire(i, at):
+        outcome = owners[i].submit(links[i % len(links)], args.poll, args.timeout)
+        outcome["at"] = at
+        with lock:
+            outcomes.append(outcome)
+
+    stop = threading.Event()
+    for p in participants:
+        threading.Thread(target=p.listen, args=(stop,), daemon=True).start()
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.max_clients) as pool:
+        for i, at in enumerate(schedule):
+            delay = start + at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, i, at)
+            if i % 50 == 0:
+                print(f"\r{i}/{len(schedule)} submitted · {time.monotonic() - start:.0f} s",
+                      end="", file=sys.stderr, flush=True)
+    elapsed = time.monotonic() - start
+    print(file=sys.stderr)
+    stop.set()
+    result = report(outcomes, elapsed, [p.stream for p in participants])
+    result["window_s"] = duration
+    return result
+
+
+def report(outcomes: list, elapsed: float, streams: list = ()) -> dict:
+    statuses = Counter(str(o["status"]) for o in outcomes)
+    verdicts = Counter(o["verdict"] for o in outcomes if o["status"] == 202)
+    graded   = [o for o in outcomes if o["verdict"] == "graded"]
+
+    # busiest 10 s of arrivals that ended in a verdict
+    buckets = Counter(int(o["at"] // 10) for o in graded)
+    events  = Counter()
+    for stream in streams:
+        events.update(stream["events"])
+    return {
+        "submissions":   len(outcomes),
+        "statuses":      dict(statuses),
+        "verdicts":      dict(verdicts),
+        "error_rate":    1 - len(graded) / len(outcomes) if outcomes else None,
+        "elapsed_s":     elapsed,
+        "verdicts_per_s": len(graded) / elapsed if elapsed > 0 else None,
+        "peak_10s_per_s": max(buckets.values()) / 10 if buckets else 0,
+        "post":          summarize([o["post_s"] for o in outcomes if o["post_s"] is not None], elapsed),
+        "verdict":       summarize([o["verdict_s"] for o in graded], elapsed),
+        "streams":       dict(Counter(str(s["state"]) for s in streams)),
+        "stream_events": dict(events),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("url", help="evaluator base URL, e.g. http://127.0.0.1:5000")
+    parser.add_argument("links", help="file with Onshape links to submit (one per line)")
+    parser.add_argument("--participants", type=int, default=150)
+    parser.add_argument("--submissions", type=int, default=3, help="submissions per participant (default 3)")
+    parser.add_argument("--duration", type=float, default=300, help="submission window before "
+                        "contest_end, s (default 300)")
+    parser.add_argument("--curve", choices=CURVES, default="exponential")
+    parser.add_argument("--tau", type=float, default=0.15, help="exponential curve: rush width as a "
+                        "fraction of the window (default 0.15)")
+    parser.add_argument("--poll", type=float, default=0.1, help="/result poll interval, s (default 0.1)")
+    parser.add_argument("--timeout", type=float, default=120, help="give up on a verdict after, s")
+    parser.add_argument("--max-clients", type=int, default=500, help="concurrent client threads")
+    parser.add_argument("--seed", type=int, help="random seed for a repeatable schedule")
+    parser.add_argument("--start", action="store_true", help="POST /start first")
+    parser.add_argument("-o", "--output", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.links, encoding="utf-8") as fh:
+        links = list(read_links(fh))
+    if not links:
+        parser.error("no links in the links file")
+    if args.start:
+        requests.post(args.url.rstrip("/") + "/start", timeout=10).raise_for_status()
+        wait_running(args.url)
+
+    result = run(args, links)
+    result["settings"] = {k: v for k, v in vars(args).items() if k != "output"}
+
+    post, verdict = result["post"], result["verdict"]
+    print(f"{result['submissions']} submissions in {result['elapsed_s']:.1f} s · "
+          f"statuses {result['statuses']} · verdicts {result['verdicts']}")
+    print(f"error rate {100 * (result['error_rate'] or 0):.1f}% · {result['verdicts_per_s'] or 0:.2f} "
+          f"verdicts/s (busiest 10 s: {result['peak_10s_per_s']:.2f}/s)")
+    print(f"/events streams {result['streams']} · events {result['stream_events']}")
+    for label, r in (("POST /evaluate", post), ("POST → verdict", verdict)):
+        if r["n"]:
+            print(f"{label:<15} p50 {r['p50_ms']:.0f} ms · p95 {r['p95_ms']:.0f} ms · p99 {r['p99_ms']:.0f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+Contest state shared by every evaluator process.
+
+Holds what used to be module globals in Onshape_Model_Evaluator_Flask.py:
+the contest end time, the uploaded drawing, one‑shot feedback messages (now
+per participant instead of shared by everybody) and a record of every
+submission, keyed by the participant's cookie.
+
+Backends:
+• SQLiteStateStore – default; one WAL‑mode database file that any number of
+  gunicorn workers can share.  Each write is a single transaction.
+• MemoryStateStore – single process only (debug server, scripts).
+
+Contest settings are read on every page load, so each process caches them
+for CONTEST_STATE_TTL seconds and drops the cache on its own writes.
+
+Finished submissions are also appended to a small change feed
+(finished_since) so any process can push verdicts graded by another one.
+
+Each graded submission keeps its measured (volume, mass, cx, cy, cz) values,
+one row per part, so all of them can be re‑graded in bulk (Contest_Grading.py) when a reference
+value is corrected; one cut short by a pre‑check keeps what the checks saw
+(part count, bounding box) instead.  update_grades() bumps the
+"grades_version" setting so every process knows to rebuild what it derived
+from the old grades.
+
+Configuration (environment or .env):
+    CONTEST_STATE_BACKEND   sqlite | memory (default sqlite)
+    CONTEST_STATE_DB        database file (default contest_state.db)
+    CONTEST_STATE_TTL       seconds settings are cached per process (default 1)
+"""
+
+import os, json, sqlite3, threading, time
+from datetime import datetime
+
+BACKEND   = os.getenv("CONTEST_STATE_BACKEND", "sqlite")
+DB_PATH   = os.getenv("CONTEST_STATE_DB", "contest_state.db")
+CACHE_TTL = float(os.getenv("CONTEST_STATE_TTL", "1"))
+
+SUBMISSION_FIELDS = ("id", "participant", "name", "link", "accepted_at", "status",
+                     "result", "error", "solved", "score", "wait_seconds", "run_seconds",
+                     "problem", "measured", "checks")
+FINISHED = ("done", "failed")
+
+
+def submission_record(job) -> dict:
+    """Contest_Jobs.Job → the row we keep for it.
+
+    A finished grading job's result is ``{"message", "solved", "score",
+    "problem", "measured", "checks"}``; ``measured`` holds the (volume, mass, cx,
+    cy, cz) row of every part the verdict was computed from (rows saved before
+    multi‑part grading are one flat list), None if the model couldn't be
+    measured; ``checks`` is ``{"parts": count, "box": [low, high] | None}`` (mm)
+    as the pre‑checks saw it, None if they didn't run.
+    """
+    verdict = job.result or {}
+    return {
+        "id":           job.id,
+        "participant":  job.owner,
+        "name":         job.meta.get("name"),
+        "link":         job.args[0] if job.args else None,
+        "accepted_at":  job.accepted_at,
+        "status":       job.status,
+        "result":       verdict.get("message"),
+        "error":        job.error,
+        "solved":       verdict.get("solved"),
+        "score":        verdict.get("score"),
+        "wait_seconds": job.wait_seconds,
+        "run_seconds":  job.run_seconds,
+        "problem":      verdict.get("problem"),
+        "measured":     verdict.get("measured"),
+        "checks":       verdict.get("checks"),
+    }
+
+
+class StateStore:
+    """Interface every backend implements; also owns the settings read cache."""
+
+    def __init__(self, cache_ttl: float = CACHE_TTL):
+        self._cache_ttl = cache_ttl
+        self._cached    = None                      # (expires_at, settings)
+        self._cache_lock = threading.Lock()
+
+    # contest settings ------------------------------------------------
+
+    def contest(self) -> dict:
+        """``{"contest_end": datetime | None, "drawing_file" / "drawing_srcset" /
+        "drawing_size": str | None, "grades_version": int}``"""
+        now = time.monotonic()
+        with self._cache_lock:
+            if self._cached is not None and self._cached[0] > now:
+                return self._cached[1]
+        settings = self._load_contest()
+        with self._cache_lock:
+            self._cached = (now + self._cache_ttl, settings)
+        return settings
+
+    def update_contest(self, **fields) -> None:
+        self._save_contest(fields)
+        with self._cache_lock:
+            self._cached = None
+
+    # backend hooks / per‑participant data ------------------------------
+
+    def _load_contest(self) -> dict:
+        raise NotImplementedError
+
+    def _save_contest(self, fields: dict) -> None:
+        raise NotImplementedError
+
+    def push_message(self, participant: str, html: str) -> None:
+        raise NotImplementedError
+
+    def pop_message(self, participant: str) -> str:
+        raise NotImplementedError
+
+    def save_submission(self, record: dict) -> None:
+        raise NotImplementedError
+
+    def get_submission(self, submission_id: str):
+        raise NotImplementedError
+
+    def finished_since(self, cursor: int) -> list:
+        """``[(seq, record), ...]`` for submissions that finished after ``cursor``."""
+        raise NotImplementedError
+
+    def latest_seq(self) -> int:
+        raise NotImplementedError
+
+    def graded_submissions(self) -> list:
+        """``[(id, problem, measured, checks), ...]`` for every submission with measured
+        values or, cut short by a pre‑check, with the checks' inputs (measured None)."""
+        raise NotImplementedError
+
+    def update_grades(self, grades) -> None:
+        """Apply ``[(id, solved, score), ...]`` in one go and bump grades_version."""
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    def __init__(self, cache_ttl: float = 0):
+        super().__init__(cache_ttl)
+        self._lock        = threading.Lock()
+        self._settings    = {"contest_end": None, "drawing_file": None, "drawing_srcset": None,
+                             "drawing_size": None, "grades_version": 0}
+        self._messages    = {}
+        self._submissions = {}
+        self._finished    = []                      # [(seq, submission id)]
+
+    def _load_contest(self):
+        with self._lock:
+            return dict(self._settings)
+
+    def _save_contest(self, fields):
+        with self._lock:
+            self._settings.update(fields)
+
+    def push_message(self, participant, html):
+        with self._lock:
+            self._messages[participant] = html
+
+    def pop_message(self, participant):
+        with self._lock:
+            return self._messages.pop(participant, "")
+
+    def save_submission(self, record):
+        with self._lock:
+            self._submissions[record["id"]] = dict(record)
+            if record["status"] in FINISHED:
+                self._finished.append((len(self._finished) + 1, record["id"]))
+
+    def get_submission(self, submission_id):
+        with self._lock:
+            record = self._submissions.get(submission_id)
+            return dict(record) if record else None
+
+    def finished_since(self, cursor):
+        with self._lock:
+            return [(seq, dict(self._submissions[sid]))
+                    for seq, sid in self._finished[cursor:]]
+
+    def latest_seq(self):
+        with self._lock:
+            return len(self._finished)
+
+    def graded_submissions(self):
+        with self._lock:
+            return [(r["id"], r["problem"], r["measured"], r.get("checks"))
+                    for r in self._submissions.values()
+                    if r.get("measured") is not None or r.get("checks") is not None]
+
+    def update_grades(self, grades):
+        with self._lock:
+            for sid, solved, score in grades:
+                self._submissions[sid].update(solved=solved, score=score)
+            self._settings["grades_version"] += 1
+
+
+class SQLiteStateStore(StateStore):
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contest (
+            key   TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            participant TEXT PRIMARY KEY,
+            html        TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS submissions (
+            id           TEXT PRIMARY KEY,
+            participant  TEXT,
+            name         TEXT,
+            link         TEXT,
+            accepted_at  TEXT NOT NULL,
+            status       TEXT NOT NULL,
+            result       TEXT,
+            error        TEXT,
+            solved       INTEGER,
+            score        REAL,
+            wait_seconds REAL,
+            run_seconds  REAL,
+            problem      TEXT,
+            measured     TEXT,
+            checks       TEXT
+        );
+        CREATE INDEX IF NOT EXISTS submissions_participant
+            ON submissions (participant, accepted_at);
+        CREATE TABLE IF NOT EXISTS finished (
+            seq           INTEGER PRIMARY KEY AUTOINCREMENT,
+            submission_id TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = DB_PATH, cache_ttl: float = CACHE_TTL):
+        super().__init__(cache_ttl)
+        self.path   = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self._SCHEMA)
+        # databases created before a column existed
+        have = {row["name"] for row in conn.execute("PRAGMA table_info(submissions)")}
+        for column, ctype in (("name", "TEXT"), ("solved", "INTEGER"), ("score", "REAL"),
+                              ("problem", "TEXT"), ("measured", "TEXT"), ("checks", "TEXT")):
+            if column not in have:
+                conn.execute(f"ALTER TABLE submissions ADD COLUMN {column} {ctype}")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode; multi‑statement writes go through _write()
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        return _Transaction(self._conn())
+
+    def _load_contest(self):
+        rows = dict(self._conn().execute("SELECT key, value FROM contest").fetchall())
+        end  = rows.get("contest_end")
+        return {
+            "contest_end":  datetime.fromisoformat(end) if end else None,
+            "drawing_file": rows.get("drawing_file"),
+            "drawing_srcset": rows.get("drawing_srcset"),
+            "drawing_size": rows.get("drawing_size"),
+            "grades_version": int(rows.get("grades_version") or 0),
+        }
+
+    def _save_contest(self, fields):
+        with self._write() as conn:
+            for key, value in fields.items():
+                if isinstance(value, datetime):
+                    value = value.isoformat()
+                conn.execute("INSERT OR REPLACE INTO contest (key, value) VALUES (?, ?)",
+                             (key, value))
+
+    def push_message(self, participant, html):
+        self._conn().execute("INSERT OR REPLACE INTO messages (participant, html) VALUES (?, ?)",
+                             (participant, html))
+
+    def pop_message(self, participant):
+        # plain read first – almost every page load has nothing waiting
+        if self._conn().execute("SELECT 1 FROM messages WHERE participant = ?",
+                                (participant,)).fetchone() is None:
+            return ""
+        with self._write() as conn:
+            row = conn.execute("SELECT html FROM messages WHERE participant = ?",
+                               (participant,)).fetchone()
+            if row is None:
+                return ""
+            conn.execute("DELETE FROM messages WHERE participant = ?", (participant,))
+            return row["html"]
+
+    def save_submission(self, record):
+        values = dict(record)
+        if isinstance(values["accepted_at"], datetime):
+            values["accepted_at"] = values["accepted_at"].isoformat()
+        for field in ("measured", "checks"):
+            if values[field] is not None:
+                values[field] = json.dumps(values[field])
+        with self._write() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO submissions ({', '.join(SUBMISSION_FIELDS)}) "
+                f"VALUES ({', '.join(':' + f for f in SUBMISSION_FIELDS)})",
+                values,
+            )
+            if values["status"] in FINISHED:
+                conn.execute("INSERT INTO finished (submission_id) VALUES (?)", (values["id"],))
+
+    def get_submission(self, submission_id):
+        row = self._conn().execute("SELECT * FROM submissions WHERE id = ?",
+                                   (submission_id,)).fetchone()
+        return _submission(row) if row is not None else None
+
+    def finished_since(self, cursor):
+        rows = self._conn().execute(
+            "SELECT f.seq, s.* FROM finished f JOIN submissions s ON s.id = f.submission_id "
+            "WHERE f.seq > ? ORDER BY f.seq", (cursor,)).fetchall()
+        return [(row["seq"], _submission(row)) for row in rows]
+
+    def latest_seq(self):
+        return self._conn().execute("SELECT COALESCE(MAX(seq), 0) FROM finished").fetchone()[0]
+
+    def graded_submissions(self):
+        rows = self._conn().execute(
+            "SELECT id, problem, measured, checks FROM submissions "
+            "WHERE measured IS NOT NULL OR checks IS NOT NULL").fetchall()
+        return [(row["id"], row["problem"],
+                 json.loads(row["measured"]) if row["measured"] is not None else None,
+                 json.loads(row["checks"]) if row["checks"] is not None else None)
+                for row in rows]
+
+    def update_grades(self, grades):
+        with self._write() as conn:
+            conn.executemany("UPDATE submissions SET solved = ?, score = ? WHERE id = ?",
+                             ((int(solved), score, sid) for sid, solved, score in grades))
+            conn.execute("INSERT INTO contest (key, value) VALUES ('grades_version', '1') "
+                         "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+        with self._cache_lock:
+            self._cached = None
+
+
+def _submission(row) -> dict:
+    record = {field: row[field] for field in SUBMISSION_FIELDS}
+    record["accepted_at"] = datetime.fromisoformat(record["accepted_at"])
+    if record["solved"] is not None:
+        record["solved"] = bool(record["solved"])
+    for field in ("measured", "checks"):
+        if record[field] is not None:
+            record[field] = json.loads(record[field])
+    return record
+
+
+class _Transaction:
+    """``with`` block = one BEGIN IMMEDIATE … COMMIT (ROLLBACK on error)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def open_store(backend: str = BACKEND) -> StateStore:
+    if backend == "memory":
+        return MemoryStateStore()
+    if backend == "sqlite":
+        return SQLiteStateStore()
+    raise ValueError(f"Unknown CONTEST_STATE_BACKEND: {backend!r}")
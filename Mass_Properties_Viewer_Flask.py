@@ -1,130 +1,107 @@
-from flask import Flask, request, render_template_string
-import os, hmac, hashlib, base64, random, string, requests
-from urllib.parse import urlparse
-from email.utils import formatdate
-from dotenv import load_dotenv
-
-load_dotenv()                                       # .env support
-
-ACCESS_KEY = os.getenv("ONSHAPE_ACCESS_KEY")
-SECRET_KEY = os.getenv("ONSHAPE_SECRET_KEY")
+import hashlib, time
+from flask import Flask, Response, request, render_template, stream_with_context
+from Onshape_Client import default_client, get_parts, iter_mass_props, parse_link_wvm
+from Onshape_Metrics import install as install_metrics, timed
 
 app = Flask(__name__)
-
-# ------------------------------------------------------------------
-#  Helpers copied from the working CLI script
-# ------------------------------------------------------------------
-def _random_nonce(length: int = 25) -> str:
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
-
-def build_headers(method: str, url: str,
-                  access_key: str = ACCESS_KEY,
-                  secret_key: str = SECRET_KEY) -> dict:
-    parsed = urlparse(url)
-    path, query = parsed.path, parsed.query or ""
-
-    nonce = _random_nonce()                         # single nonce
-    date  = formatdate(localtime=False, usegmt=True)
-    ctype = ""
-
-    string_to_sign = "\n".join([
-        method,
-        nonce,
-        date,
-        ctype,
-        path,
-        query
-    ]) + "\n"
-
-    signature = base64.b64encode(
-        hmac.new(secret_key.encode(),
-                 string_to_sign.lower().encode(),
-                 hashlib.sha256).digest()
-    ).decode()
-
-    return {
-        "Authorization": f"On {access_key}:HmacSHA256:{signature}",
-        "On-Nonce": nonce,                          # same nonce!
-        "Date": date,
-        "Accept": "application/json"
-    }
-
-def get_json(url: str) -> dict:
-    res = requests.get(url, headers=build_headers("GET", url))
-    res.raise_for_status()
-    return res.json()
-
-def get_parts(doc, ws, elem):
-    return get_json(f"https://cad.onshape.com/api/parts/d/{doc}/w/{ws}/e/{elem}")
-
-def get_mass_props(doc, ws, elem, pid):
-    return get_json(f"https://cad.onshape.com/api/parts/d/{doc}/w/{ws}/e/{elem}/partid/{pid}/massproperties")
-
-def chunk_list(lst, n):                             # same as CLI
-    return [lst[i:i+n] for i in range(0, len(lst), n)]
-
-def parse_link(link: str):
-    parts = urlparse(link).path.strip('/').split('/')
+install_metrics(app)    # /metrics (+ Server‑Timing with METRICS_SERVER_TIMING=1)
+
+# compiled once; the empty form (GET) never changes, so it's rendered once too.
+# Results are streamed between SHELL and SHELL_END as each part arrives.
+SHELL = app.jinja_env.from_string('''
+    <!doctype html>
+    <title>Onshape Mass-Properties Viewer</title>
+    <h2>Onshape Mass-Properties Viewer</h2>
+    <form method="post">
+        Onshape public link:&nbsp;
+        <input name="link" size="80" required value="{{ link|e }}">
+        <button type="submit">Get Properties</button>
+    </form>
+    <hr>
+    <div>''')
+SHELL_END = "</div>\n"
+_empty_page = None      # (etag, html)
+
+
+def part_html(name, props, err) -> str:
+    if err is not None:                         # one bad part ≠ failed page
+        return f"<p><b>{name}</b><br><span style='color:red'>Error: {err}</span></p>\n"
+    if props is None:
+        return f"<p><b>{name}</b><br>Mass-properties unavailable.</p>\n"
+
+    volume_mm3, mass_g, (x_mm, y_mm, z_mm) = props.mm()
+    return (
+        f"<p><b>{name}</b><br>"
+        f"Volume: {volume_mm3:.5f} mm³<br>"
+        f"Mass: {mass_g:.5f} g<br>"
+        f"COM: X={x_mm:.5f} mm • Y={y_mm:.5f} mm • Z={z_mm:.5f} mm</p>\n"
+    )
+
+
+def results_html(link: str):
+    """Yield the result blocks: one per part, in part‑list order, then a summary.
+
+    Parts arrive in completion order (the per‑part fallback runs them in
+    parallel); each block goes out as soon as every part before it is out.
+    """
+    start = time.monotonic()
+    try:
+        doc, wvm, ws, elem = parse_link_wvm(link)
+        # one microversion for the part list and every part's mass properties
+        state = default_client.document_state(doc, ws, wvm=wvm)
+        names = {p.part_id: p.name for p in get_parts(doc, ws, elem, wvm=wvm, state=state)}
+    except Exception as exc:
+        yield f"<p style='color:red'>Error: {exc}</p>\n"
+        return
+
+    order, ready, sent = list(names), {}, 0          # ready: pid → block, waiting for earlier parts
+    failed = seen = 0
     try:
-        doc = parts[parts.index('documents') + 1]
-        ws  = parts[parts.index('w') + 1]           # could be 'v'
-        elem = parts[parts.index('e') + 1]
-        return doc, ws, elem
-    except (ValueError, IndexError):
-        raise ValueError("Invalid Onshape URL")
+        for pid, props, err in iter_mass_props(doc, ws, elem, order, wvm=wvm, state=state):
+            seen   += 1
+            failed += err is not None or props is None
+            ready[pid] = part_html(names.get(pid, pid), props, err)
+            while sent < len(order) and order[sent] in ready:
+                yield ready.pop(order[sent])
+                sent += 1
+    except Exception as exc:
+        # the shell is already out – finish the page with the error, not a cut‑off
+        failed += len(names) - seen
+        yield "".join(ready.pop(pid) for pid in order[sent:] if pid in ready)
+        yield f"<p style='color:red'>Error: {exc}</p>\n"
+
+    yield (f"<hr><p><i>{len(names)} parts · {len(names) - failed} measured · {failed} failed · "
+           f"{time.monotonic() - start:.2f} s</i></p>\n")
 
 # ------------------------------------------------------------------
 #  Flask route
 # ------------------------------------------------------------------
 @app.route('/', methods=['GET', 'POST'])
 def index():
-    result_html = ""
-    if request.method == 'POST':
-        try:
-            doc, ws, elem = parse_link(request.form['link'].strip())
-            for part in get_parts(doc, ws, elem):
-                pid   = part.get("partId")
-                name  = part.get("name")
-
-                props = get_mass_props(doc, ws, elem, pid)
-                body  = props.get("bodies", {}).get(pid, {})
-
-                vol_arr   = body.get("volume",   props.get("volume", []))
-                cent_arr  = body.get("centroid", props.get("centroid", []))
-                mass_arr  = body.get("mass",     props.get("mass", []))
-
-                volumes   = vol_arr if isinstance(vol_arr, list) else [vol_arr]
-                centroids = chunk_list(cent_arr, 3) if isinstance(cent_arr, list) else [[0,0,0]]
-                masses    = mass_arr if isinstance(mass_arr, list) else [mass_arr]
-
-                if volumes and centroids and masses:
-                    volume_mm3 = volumes[0] * 1e9
-                    x_mm, y_mm, z_mm = [c * 1000 for c in centroids[0]]
-                    mass_g = masses[0] * 1000
-
-                    result_html += (
-                        f"<p><b>{name}</b><br>"
-                        f"Volume: {volume_mm3:.5f} mm³<br>"
-                        f"Mass: {mass_g:.5f} g<br>"
-                        f"COM: X={x_mm:.5f} mm • Y={y_mm:.5f} mm • Z={z_mm:.5f} mm</p>"
-                    )
-                else:
-                    result_html += f"<p><b>{name}</b><br>Mass-properties unavailable.</p>"
-        except Exception as exc:
-            result_html = f"<p style='color:red'>Error: {exc}</p>"
-
-    return render_template_string('''
-        <!doctype html>
-        <title>Onshape Mass-Properties Viewer</title>
-        <h2>Onshape Mass-Properties Viewer</h2>
-        <form method="post">
-            Onshape public link:&nbsp;
-            <input name="link" size="80" required>
-            <button type="submit">Get Properties</button>
-        </form>
-        <hr>
-        <div>{{ result|safe }}</div>
-    ''', result=result_html)
+    global _empty_page
+    if request.method == 'GET':
+        if _empty_page is None:
+            with timed("render"):
+                html = render_template(SHELL, link="") + SHELL_END
+            _empty_page = (hashlib.sha1(html.encode()).hexdigest()[:16], html)
+        response = app.make_response(_empty_page[1])
+        response.set_etag(_empty_page[0])
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
+    # Stream: the shell goes out at once, each part's block as its mass
+    # properties arrive – nothing accumulates, whatever the part count.
+    link = request.form['link'].strip()
+    with timed("render"):
+        shell = render_template(SHELL, link=link)
+
+    def generate():
+        yield shell
+        yield from results_html(link)
+        yield SHELL_END
+
+    return Response(stream_with_context(generate()), mimetype="text/html",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-store"})
 
 # ------------------------------------------------------------------
 if __name__ == '__main__':
@@ -0,0 +1,171 @@
+"""
+Bulk mass‑properties export: many Onshape links in, one JSON line per link out.
+
+For after‑contest grading and class‑wide homework checks:
+
+    python Onshape_Batch_Evaluate.py links.txt -o results.jsonl
+    cat links.txt | python Onshape_Batch_Evaluate.py - -o results.jsonl --jobs 16
+
+• Links are read lazily (one per line, blank lines and #comments skipped) and
+  at most 2×--jobs are in flight, so memory stays flat for any input size.
+• Each record is appended to the output and flushed as soon as its link is
+  done – the output file doubles as the checkpoint.  Re‑running with the same
+  -o skips every link that already has a successful record there (errors,
+  e.g. a quota cut‑off, are retried; the newest line for a link wins).
+• Progress, throughput and ETA go to stderr.
+• Requests run in the batch lane of the rate limiter, behind contest and
+  viewer traffic.
+"""
+
+import argparse, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from Onshape_Client import default_client, parse_link_wvm
+from Onshape_Rate_Limiter import LANE_BATCH, set_lane
+
+
+def read_links(stream):
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def finished_links(path: str) -> set:
+    """Links that already have a successful record in an earlier output file."""
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue                            # torn last line after a crash
+            if "error" not in record:
+                done.add(record["link"])
+            else:
+                done.discard(record["link"])        # the newest line wins
+    return done
+
+
+def evaluate_link(link: str) -> dict:
+    record = {"link": link}
+    try:
+        doc, wvm, ws, elem = parse_link_wvm(link)
+        record.update(document=doc, wvm=wvm, workspace=ws, element=elem)
+
+        state   = default_client.document_state(doc, ws, wvm=wvm)
+        parts   = default_client.get_parts(doc, ws, elem, wvm=wvm, state=state)
+        results = default_client.get_all_mass_props(
+            doc, ws, elem, [p.part_id for p in parts], wvm=wvm, state=state)
+
+        record["parts"] = []
+        for part, (pid, props, err) in zip(parts, results):
+            entry = {"partId": pid, "name": part.name}
+            if err is not None:
+                entry["error"] = str(err)
+            elif props is None:
+                entry["error"] = "Mass-properties unavailable."
+            else:
+                entry["volume_mm3"], entry["mass_g"], entry["centroid_mm"] = props.mm()
+            record["parts"].append(entry)
+        failed = sum("error" in entry for entry in record["parts"])
+        if failed:
+            # a link is only finished when every part is – resume refetches it
+            record["error"] = f"{failed} of {len(parts)} parts failed."
+    except Exception as exc:
+        record["error"] = str(exc)
+    return record
+
+
+class Progress:
+    """One stderr status line, rewritten at most once per ``every`` seconds."""
+
+    def __init__(self, total=None, every: float = 1.0):
+        self.total, self.every = total, every
+        self.done = self.errors = self.skipped = 0
+        self.start = self._last = time.monotonic()
+
+    def update(self, record=None, skipped=False, force=False):
+        if skipped:
+            self.skipped += 1
+        elif record is not None:
+            self.done += 1
+            self.errors += "error" in record
+        now = time.monotonic()
+        if not force and now - self._last < self.every:
+            return
+        self._last = now
+
+        rate = self.done / max(now - self.start, 1e-9)
+        line = f"{self.done} done, {self.skipped} skipped, {self.errors} errors · {rate:.1f} links/s"
+        if self.total is not None:
+            left = self.total - self.done - self.skipped
+            eta  = left / rate if rate > 0 else float("inf")
+            line += f" · {left} left · ETA {_clock(eta)}"
+        print("\r" + line.ljust(79), end="", file=sys.stderr, flush=True)
+
+
+def _clock(seconds: float) -> str:
+    if seconds == float("inf"):
+        return "--:--"
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+def count_links(path: str):
+    if path == "-":
+        return None                                 # can't rewind stdin
+    with open(path, encoding="utf-8") as fh:
+        return sum(1 for _ in read_links(fh))
+
+
+def run(links, out, jobs: int, done: set, progress: Progress) -> None:
+    with ThreadPoolExecutor(max_workers=jobs, initializer=set_lane,
+                            initargs=(LANE_BATCH,)) as pool:
+        pending = set()
+
+        def drain(block_until_below):
+            nonlocal pending
+            while len(pending) > block_until_below:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    progress.update(record)
+
+        for link in links:
+            if link in done:
+                progress.update(skipped=True)
+                continue
+            drain(2 * jobs - 1)
+            pending.add(pool.submit(evaluate_link, link))
+        drain(0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("links", help="file with one Onshape link per line, or - for stdin")
+    parser.add_argument("-o", "--output", help="JSONL output / checkpoint file (default: stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="links fetched in parallel (default 8)")
+    args = parser.parse_args(argv)
+
+    done     = finished_links(args.output)
+    progress = Progress(count_links(args.links))
+    source   = sys.stdin if args.links == "-" else open(args.links, encoding="utf-8")
+    out      = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        run(read_links(source), out, max(1, args.jobs), done, progress)
+    finally:
+        progress.update(force=True)
+        print(file=sys.stderr)
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
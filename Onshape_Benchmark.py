@@ -0,0 +1,241 @@
+"""
+Latency / throughput benchmarks against a local fake Onshape (Onshape_Fake_Server).
+
+    python Onshape_Benchmark.py -o bench.json
+    python Onshape_Benchmark.py --latency 0.08 --parts 50 --baseline bench.json
+    python Onshape_Benchmark.py --only signing,viewer --error-rate 0.05
+
+Scenarios (p50 / p95 / p99 latency and operations per second for each):
+    signing     build_headers() – the per‑request HMAC hot path
+    evaluate    one contest grading (grade_link: part list, bounding box, mass properties)
+    viewer      the viewer page for a ``--parts``‑part model, POSTed through Flask
+    contest     ``--submissions`` /evaluate posts from ``--concurrency`` participants,
+                timed from the POST until the verdict is stored
+
+For evaluate and contest the fake model is registered as the contest problem
+(Onshape_Fake_Server.solution), so every grading runs the whole cascade and
+only a solved verdict counts as a success; a run in which no request reached
+massproperties – everything stopped at a pre‑check – is an error.
+
+The apps run in‑process against the fake server with the response cache off
+(``--cache`` turns it on) and the rate limiter opened up (``--rate-limit``).
+Results are printed and, with -o, written as JSON; --baseline prints the
+change against an earlier JSON file.
+"""
+
+import argparse, json, os, platform, sys, threading, time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from Onshape_Fake_Server import FakeOnshape, ACCESS_KEY, SECRET_KEY, solution
+
+SCENARIOS = ("signing", "evaluate", "viewer", "contest")
+LINK = "https://cad.onshape.com/documents/{doc}/w/bbbbbbbbbbbbbbbbbbbbbbbb/e/cccccccccccccccccccccccc"
+
+
+def percentile(sorted_samples: list, q: float) -> float:
+    """Nearest‑rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = max(0, min(len(sorted_samples) - 1, round(q / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+def summarize(samples: list, elapsed: float, errors: int = 0) -> dict:
+    samples = sorted(samples)
+    return {
+        "n":       len(samples),
+        "errors":  errors,
+        "mean_ms": sum(samples) / len(samples) * 1e3 if samples else None,
+        "p50_ms":  percentile(samples, 50) * 1e3 if samples else None,
+        "p95_ms":  percentile(samples, 95) * 1e3 if samples else None,
+        "p99_ms":  percentile(samples, 99) * 1e3 if samples else None,
+        "ops_per_s": len(samples) / elapsed if elapsed > 0 else None,
+    }
+
+
+def timed(fn, n: int, concurrency: int = 1) -> dict:
+    """Run ``fn(i)`` ``n`` times on ``concurrency`` threads; latency of each call."""
+    samples, errors, lock = [], 0, threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            ok = fn(i) is not False
+        except Exception:
+            ok = False
+        took = time.perf_counter() - t0
+        with lock:
+            if ok:
+                samples.append(took)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(n):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(n)))
+    return summarize(samples, time.perf_counter() - start, errors)
+
+
+# ────────────────────────────────────────────────────────────────
+#  Scenarios – each returns a summarize() dict
+# ────────────────────────────────────────────────────────────────
+
+def bench_signing(args, fake):
+    from Onshape_Client import build_headers
+    url = fake.url + "/api/parts/d/a/w/b/e/c/partid/JHD/massproperties"
+    return timed(lambda i: build_headers("GET", url, ACCESS_KEY, SECRET_KEY), args.iterations * 10)
+
+
+def contest_evaluator(args):
+    """The evaluator, with the fake model as its problem – so gradings aren't cut short."""
+    import Onshape_Model_Evaluator_Flask as evaluator
+    evaluator.grader.add_problem(evaluator.PROBLEM, solution(args.parts), abs_tol=evaluator.TOLERANCE)
+    evaluator.PARTS = args.parts
+    return evaluator
+
+
+def mass_props_calls(fake) -> int:
+    stats = fake.stats()
+    return stats["studio_mass"] + stats["part_mass"]
+
+
+def check_reached_mass_props(fake, before: int) -> None:
+    if mass_props_calls(fake) == before:
+        raise RuntimeError("no grading reached the mass‑properties call – "
+                           "the scenario only measured pre‑check rejections")
+
+
+def bench_evaluate(args, fake):
+    evaluator = contest_evaluator(args)
+    before    = mass_props_calls(fake)
+
+    def grade(i):
+        return bool(evaluator.grade_link(LINK.format(doc=f"{i:024x}"))["solved"])
+    result = timed(grade, args.iterations)
+    check_reached_mass_props(fake, before)
+    return result
+
+
+def bench_viewer(args, fake):
+    import Mass_Properties_Viewer_Flask as viewer
+    client = viewer.app.test_client()
+
+    def page(i):
+        res = client.post("/", data={"link": LINK.format(doc=f"{i:024x}")})
+        return res.status_code == 200 and "Error" not in res.get_data(as_text=True)
+    return timed(page, max(1, args.iterations // 5))
+
+
+def bench_contest(args, fake):
+    evaluator = contest_evaluator(args)
+    before    = mass_props_calls(fake)
+    evaluator.store.update_contest(contest_end=datetime.utcnow() + evaluator.CONTEST_LENGTH)
+
+    def submit(i):
+        client = evaluator.app.test_client()
+        res = client.post("/evaluate", data={"link": LINK.format(doc=f"{i:024x}"), "name": f"p{i}"},
+                          headers={"Accept": "application/json"})
+        if res.status_code != 202:
+            return False
+        job_id = res.get_json()["id"]
+        while True:                                 # verdict lands in the shared store
+            record = evaluator.store.get_submission(job_id)
+            if record["status"] in ("done", "failed"):
+                return record["status"] == "done" and bool(record["solved"])
+            time.sleep(0.002)
+    result = timed(submit, args.submissions, args.concurrency)
+    check_reached_mass_props(fake, before)
+    return result
+
+
+# ────────────────────────────────────────────────────────────────
+#  Reporting
+# ────────────────────────────────────────────────────────────────
+
+def report(results: dict, baseline: dict = None) -> None:
+    print(f"{'scenario':<10} {'n':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for name, r in results["scenarios"].items():
+        line = (f"{name:<10} {r['n']:>6} {r['errors']:>4} {_ms(r['p50_ms'])} {_ms(r['p95_ms'])} "
+                f"{_ms(r['p99_ms'])} {r['ops_per_s'] or 0:>10.1f}")
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old and old.get("p95_ms") and r["p95_ms"]:
+            line += f"   p95 {100 * (r['p95_ms'] / old['p95_ms'] - 1):+.1f}%"
+            if old.get("ops_per_s") and r["ops_per_s"]:
+                line += f", ops/s {100 * (r['ops_per_s'] / old['ops_per_s'] - 1):+.1f}%"
+        print(line)
+
+
+def _ms(value) -> str:
+    return f"{value:>9.3f}" if value is not None else f"{'-':>9}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", help=f"comma‑separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--iterations", type=int, default=200, help="base iteration count (default 200)")
+    parser.add_argument("--parts", type=int, default=20, help="parts in the fake model (default 20)")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake API latency, s (default 0.02)")
+    parser.add_argument("--jitter", type=float, default=0.005, help="± latency jitter, s (default 0.005)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of failed API responses")
+    parser.add_argument("--submissions", type=int, default=100, help="contest submissions (default 100)")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent participants (default 20)")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--rate-limit", type=float, default=1e6, help="req/s allowed by the limiter")
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    chosen = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = set(chosen) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    fake = FakeOnshape(parts=args.parts, latency=args.latency, jitter=args.jitter,
+                       error_rate=args.error_rate).start()
+    # the client modules read their settings at import – configure them first
+    os.environ.update({
+        "ONSHAPE_BASE_URL":   fake.url,
+        "ONSHAPE_ACCESS_KEY": ACCESS_KEY,
+        "ONSHAPE_SECRET_KEY": SECRET_KEY,
+        "ONSHAPE_CACHE_SIZE": os.environ.get("ONSHAPE_CACHE_SIZE", "512") if args.cache else "0",
+        "ONSHAPE_RATE_LIMIT": str(args.rate_limit),
+        "ONSHAPE_RATE_BURST": str(args.rate_limit),
+        "CONTEST_STATE_BACKEND": "memory",
+        "EVAL_QUEUE_MAX":     str(max(args.submissions, 200)),
+    })
+
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python":     platform.python_version(),
+        "platform":   platform.platform(),
+        "settings":   {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "scenarios":  {},
+    }
+    try:
+        for name in chosen:
+            print(f"running {name}…", file=sys.stderr, flush=True)
+            results["scenarios"][name] = globals()[f"bench_{name}"](args, fake)
+    finally:
+        fake.stop()
+    results["fake_server"] = fake.stats()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    report(results, baseline)
+    if results["fake_server"]["bad_signatures"]:
+        print(f"WARNING: {results['fake_server']['bad_signatures']} requests had a bad "
+              f"HMAC signature", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
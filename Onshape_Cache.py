@@ -0,0 +1,71 @@
+"""
+Bounded LRU + TTL cache for parsed Onshape responses.
+
+Used by OnshapeClient.get_json – callers hand it a key that already pins the
+document state (microversion, or the immutable version id), so an entry can
+only ever be *old*, never *wrong*; the TTL is there to keep memory in check.
+"""
+
+import threading, time
+from collections import OrderedDict
+
+_DEFAULT_TTL = object()
+
+
+class ResponseCache:
+    """Thread‑safe LRU cache with per‑entry expiry and hit/miss counters.
+
+    ``ttl=None`` on put() stores the entry until LRU pressure evicts it –
+    meant for version (``v/``) links, whose content never changes.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self._data       = OrderedDict()            # key → (expires_at | None, value)
+        self._lock       = threading.Lock()
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]                 # expired
+            self.misses += 1
+            return default
+
+    def put(self, key, value, ttl=_DEFAULT_TTL) -> None:
+        if self.max_entries <= 0:
+            return
+        if ttl is _DEFAULT_TTL:
+            ttl = self.ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size":      len(self._data),
+                "evictions": self.evictions,
+            }
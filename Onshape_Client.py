@@ -0,0 +1,535 @@
+"""
+Shared Onshape API client used by the CLI script and both Flask apps.
+
+• build_headers – the one copy of the HMAC request signing.
+• OnshapeClient – keep‑alive connection pool shared by every thread, with
+  connect/read timeouts and a warm‑up so the first /evaluate after the
+  contest starts doesn't pay for the TCP+TLS handshake.
+• get_parts / get_bounding_box / get_all_mass_props / iter_mass_props – thin
+  helpers on the default client.  get_parts returns PartRef records and the
+  mass‑property calls MassProps records (Onshape_Records) – only the fields
+  we read are kept.
+• get_bounding_box – the part studio's bounding box, a much cheaper call than
+  mass properties (the contest's pre‑check).
+• get_mass_props_many – bounded‑concurrency fan‑out over a list of part ids.
+• get_mass_props_batched – one part‑studio request for every body, falling back
+  to the per‑part fan‑out for anything it didn't return.
+• iter_mass_props – the same, yielded part by part as each one arrives.
+• Every request goes through one adaptive token bucket (Onshape_Rate_Limiter),
+  shared by every process using the same access key, and is retried on
+  429/5xx with jittered back‑off until a deadline.
+• Identical concurrent lookups are coalesced into one upstream request.
+• Responses are cached per document state: workspace reads are keyed on the
+  current microversion (an edit means a refetch), version links forever.
+• ONSHAPE_TRAFFIC=record|replay saves replies to / serves them from an
+  on‑disk fixture store (Onshape_Fixtures) – replay spends no API quota.
+• Signing, the HTTP round trip, JSON decoding and each lookup are timed and
+  upstream status codes counted (Onshape_Metrics); cache, limiter and
+  coalescing stats are exported there too.
+
+Tuning (environment or .env):
+    ONSHAPE_BASE_URL         API host (default https://cad.onshape.com)
+    ONSHAPE_POOL_SIZE        max keep‑alive connections to the host (default 20)
+    ONSHAPE_CONNECT_TIMEOUT  seconds (default 5)
+    ONSHAPE_READ_TIMEOUT     seconds (default 30)
+    ONSHAPE_MAX_IN_FLIGHT    parallel mass‑property requests per page (default 8)
+    ONSHAPE_BATCH_MASS_PROPS 1 = part‑studio batched mass properties, 0 = per part (default 1)
+    ONSHAPE_CACHE_SIZE       max cached responses, 0 disables the cache (default 512)
+    ONSHAPE_CACHE_TTL        seconds a workspace response stays cached (default 3600)
+    ONSHAPE_MICROVERSION_TTL seconds to reuse a workspace's microversion lookup (default 1)
+    ONSHAPE_RETRY_DEADLINE   seconds a call may spend waiting/retrying on 429/5xx (default 20)
+    (rate limit settings: see Onshape_Rate_Limiter.py)
+"""
+
+import os, hmac, hashlib, base64, random, string, threading, time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from email.utils import formatdate, parsedate_to_datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+# .env support – before the imports below: those modules read their
+# settings (rate limit, traffic mode, Server‑Timing, …) when imported
+load_dotenv()
+
+from Onshape_Cache import ResponseCache
+from Onshape_Rate_Limiter import RateLimiter, current_lane, set_lane, shared_state_path
+from Onshape_Coalescing import SingleFlight
+from Onshape_Metrics import REGISTRY, timed, count_upstream
+from Onshape_Records import loads, select_parts, select_bodies, select_bbox
+from Onshape_Fixtures import FixtureStore, TRAFFIC
+
+ACCESS_KEY = os.getenv("ONSHAPE_ACCESS_KEY")
+SECRET_KEY = os.getenv("ONSHAPE_SECRET_KEY")
+
+BASE_URL        = os.getenv("ONSHAPE_BASE_URL", "https://cad.onshape.com")
+POOL_SIZE       = int(os.getenv("ONSHAPE_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("ONSHAPE_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT    = float(os.getenv("ONSHAPE_READ_TIMEOUT", "30"))
+MAX_IN_FLIGHT   = int(os.getenv("ONSHAPE_MAX_IN_FLIGHT", "8"))
+BATCH_MASS_PROPS = os.getenv("ONSHAPE_BATCH_MASS_PROPS", "1") == "1"
+CACHE_SIZE       = int(os.getenv("ONSHAPE_CACHE_SIZE", "512"))
+CACHE_TTL        = float(os.getenv("ONSHAPE_CACHE_TTL", "3600"))
+MICROVERSION_TTL = float(os.getenv("ONSHAPE_MICROVERSION_TTL", "1"))
+RETRY_DEADLINE   = float(os.getenv("ONSHAPE_RETRY_DEADLINE", "20"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_BASE     = 0.25                               # seconds, first back‑off ceiling
+RETRY_CAP      = 8.0
+
+_MISS = object()
+
+# ────────────────────────────────────────────────────────────────
+#  Request signing
+# ────────────────────────────────────────────────────────────────
+
+def _random_nonce(length: int = 25) -> str:
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+def build_headers(method: str, url: str,
+                  access_key: str = ACCESS_KEY,
+                  secret_key: str = SECRET_KEY) -> dict:
+    with timed("sign"):
+        return _build_headers(method, url, access_key, secret_key)
+
+
+def _build_headers(method, url, access_key, secret_key) -> dict:
+    parsed = urlparse(url)
+    path, query = parsed.path, parsed.query or ""
+
+    nonce = _random_nonce()                             # single nonce
+    date  = formatdate(localtime=False, usegmt=True)
+    ctype = ""
+
+    string_to_sign = "\n".join([
+        method,
+        nonce,
+        date,
+        ctype,
+        path,
+        query
+    ]) + "\n"
+
+    signature = base64.b64encode(
+        hmac.new(secret_key.encode(),
+                 string_to_sign.lower().encode(),
+                 hashlib.sha256).digest()
+    ).decode()
+
+    return {
+        "Authorization": f"On {access_key}:HmacSHA256:{signature}",
+        "On-Nonce": nonce,                              # same nonce!
+        "Date": date,
+        "Accept": "application/json"
+    }
+
+
+def _retry_after(res):
+    """Retry‑After header → seconds (it may be a delay or an HTTP date)."""
+    value = res.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+# ────────────────────────────────────────────────────────────────
+#  Pooled client
+# ────────────────────────────────────────────────────────────────
+
+class OnshapeClient:
+    """Signed GETs against one Onshape host over a shared keep‑alive pool.
+
+    requests.Session isn't safe to share between threads, so each thread
+    gets its own lightweight Session – but they all mount the same
+    HTTPAdapter, whose urllib3 pool is thread‑safe.  The pool blocks at
+    ``pool_size`` instead of opening throw‑away connections during a burst.
+    """
+
+    def __init__(self, base_url: str = BASE_URL,
+                 access_key: str = ACCESS_KEY,
+                 secret_key: str = SECRET_KEY,
+                 pool_size: int = POOL_SIZE,
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT,
+                 cache_size: int = CACHE_SIZE,
+                 cache_ttl: float = CACHE_TTL,
+                 microversion_ttl: float = MICROVERSION_TTL,
+                 limiter: RateLimiter = None,
+                 retry_deadline: float = RETRY_DEADLINE,
+                 traffic: str = TRAFFIC,
+                 fixtures: FixtureStore = None):
+        self.base_url   = base_url.rstrip('/')
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.pool_size  = pool_size
+        self.timeout    = (connect_timeout, read_timeout)
+        self.cache      = ResponseCache(cache_size, cache_ttl)
+        self.microversion_ttl = microversion_ttl
+        # one bucket per account, shared with every other process using it
+        self.limiter    = limiter or RateLimiter(shared=shared_state_path(access_key or ""))
+        self.inflight   = SingleFlight()
+        self.retry_deadline = retry_deadline
+        if traffic not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown ONSHAPE_TRAFFIC: {traffic!r}")
+        self.traffic    = traffic
+        self.fixtures   = fixtures or (FixtureStore() if traffic != "off" else None)
+
+        self._adapter = HTTPAdapter(pool_connections=1,
+                                    pool_maxsize=pool_size,
+                                    pool_block=True)
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def api_url(self, path: str) -> str:
+        return f"{self.base_url}/api/{path.lstrip('/')}"
+
+    def _element_url(self, kind, doc, wvm, ws, elem) -> str:
+        return self.api_url(f"{kind}/d/{doc}/{wvm}/{ws}/e/{elem}")
+
+    def get_json(self, url: str, state=None, select=None):
+        """Signed GET → parsed JSON, or ``select(parsed JSON)``.
+
+        ``state`` (from document_state) pins the document version the URL
+        reads; with it the response is served from / stored in the cache.
+        ``select`` (an Onshape_Records selector) reduces the reply to the
+        records the caller needs; that, not the full reply, is cached.
+        Concurrent misses for the same key share one upstream request.
+        """
+        with timed("get_json"):
+            tag = (url,) if select is None else (url, select.__name__)
+            key = None
+            if state is not None:
+                prefix, ttl = state
+                key = prefix + tag
+                data = self.cache.get(key, _MISS)
+                if data is not _MISS:
+                    return data
+
+            def fetch():
+                content = self._fetch(url)
+                with timed("decode"):
+                    data = loads(content)
+                    if select is not None:
+                        data = select(data)
+                if key is not None:
+                    self.cache.put(key, data, ttl)
+                return data
+
+            return self.inflight.do(key if key is not None else tag, fetch)
+
+    def _fetch(self, url: str) -> bytes:
+        """Reply body for ``url``: from Onshape (recorded in record mode) or,
+        in replay mode, from the fixture store at the recorded latency."""
+        parsed = urlparse(url)
+        request_path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        if self.traffic == "replay":
+            self.limiter.acquire(deadline=time.monotonic() + self.retry_deadline)
+            with timed("upstream"):
+                return self.fixtures.replay(request_path)
+
+        res = self._request(url)
+        if self.traffic == "record":
+            self.fixtures.record(request_path, res)
+        return res.content
+
+    def _request(self, url: str) -> requests.Response:
+        """Rate‑limited signed GET, retried with jittered back‑off until the deadline.
+
+        429/5xx and connection errors are retried; Retry‑After wins over the
+        computed back‑off.  Once the deadline would be overshot the last
+        error is raised as before (raise_for_status / requests exception).
+        """
+        deadline = time.monotonic() + self.retry_deadline
+        attempt  = 0
+        while True:
+            self.limiter.acquire(deadline=deadline)
+            headers = build_headers("GET", url, self.access_key, self.secret_key)
+            try:
+                with timed("upstream"):
+                    res = self._session().get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                count_upstream("error")
+                if not self._backoff(attempt, deadline):
+                    raise
+                attempt += 1
+                continue
+
+            count_upstream(res.status_code)
+            retry_after = _retry_after(res)
+            self.limiter.record(res.status_code, retry_after)
+            if res.status_code in RETRY_STATUSES and self._backoff(attempt, deadline, retry_after):
+                attempt += 1
+                continue
+            res.raise_for_status()
+            return res
+
+    def _backoff(self, attempt: int, deadline: float, retry_after: float = None) -> bool:
+        # full jitter: uniform(0, base·2ⁿ) capped; Retry‑After gets a little jitter too
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, 0.1 * retry_after + 0.1)
+        else:
+            delay = random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def document_state(self, doc, ws, *, wvm="w"):
+        """Cache‑key prefix + TTL that pin what ``doc``/``ws`` looks like right now.
+
+        Version (and microversion) links are immutable, so they key on their
+        own id and never expire.  Workspaces key on the current microversion,
+        so an edit to the model yields a new key and a fresh fetch.
+        Returns None when caching is disabled.
+        """
+        if self.cache.max_entries <= 0:
+            return None
+        if wvm != "w":
+            return (doc, wvm, ws), None
+
+        mv_key = ("microversion", doc, ws)
+        mv = self.cache.get(mv_key) if self.microversion_ttl > 0 else None
+        if mv is None:
+            mv = self.get_json(self.api_url(f"documents/d/{doc}/w/{ws}/currentmicroversion"))["microversion"]
+            if self.microversion_ttl > 0:
+                self.cache.put(mv_key, mv, self.microversion_ttl)
+        return (doc, wvm, ws, mv), self.cache.ttl
+
+    def get_parts(self, doc, ws, elem, *, wvm="w", state=_MISS):
+        with timed("get_parts"):
+            if state is _MISS:
+                state = self.document_state(doc, ws, wvm=wvm)
+            return self.get_json(self._element_url("parts", doc, wvm, ws, elem), state,
+                                 select_parts)
+
+    def get_mass_props(self, doc, ws, elem, pid, *, wvm="w", state=_MISS):
+        """MassProps for one part, or None if the reply has no usable values."""
+        with timed("get_mass_props"):
+            if state is _MISS:
+                state = self.document_state(doc, ws, wvm=wvm)
+            bodies = self.get_json(self._element_url("parts", doc, wvm, ws, elem)
+                                   + f"/partid/{pid}/massproperties", state, select_bodies)
+            # the part's own entry, else the reply's flattened arrays
+            return bodies.get(pid) or bodies.get(None)
+
+    def get_bounding_box(self, doc, ws, elem, *, wvm="w", state=_MISS):
+        """BoundingBox around every visible part in the part studio, or None."""
+        with timed("get_bounding_box"):
+            if state is _MISS:
+                state = self.document_state(doc, ws, wvm=wvm)
+            return self.get_json(self._element_url("partstudios", doc, wvm, ws, elem)
+                                 + "/boundingboxes", state, select_bbox)
+
+    def get_partstudio_mass_props(self, doc, ws, elem, *, wvm="w", state=_MISS):
+        if state is _MISS:
+            state = self.document_state(doc, ws, wvm=wvm)
+        # massAsGroup=false → one entry per part under "bodies", keyed by partId
+        return self.get_json(self._element_url("partstudios", doc, wvm, ws, elem)
+                             + "/massproperties?massAsGroup=false", state, select_bodies)
+
+    def get_mass_props_many(self, doc, ws, elem, pids,
+                            max_in_flight: int = MAX_IN_FLIGHT,
+                            *, wvm="w", state=_MISS) -> list:
+        """Fetch mass properties for every part id, at most ``max_in_flight`` at once.
+
+        Returns ``[(pid, MassProps | None, error), ...]`` in the same order as
+        ``pids``; one failing part sets its ``error`` and leaves the others
+        untouched.
+        """
+        pids = list(pids)
+        if not pids:
+            return []
+        if state is _MISS:
+            state = self.document_state(doc, ws, wvm=wvm)
+
+        def fetch(pid):
+            return self._mass_props_result(doc, ws, elem, pid, wvm, state)
+
+        workers = max(1, min(max_in_flight, len(pids)))
+        with ThreadPoolExecutor(max_workers=workers, initializer=set_lane,
+                                initargs=(current_lane(),)) as pool:
+            return list(pool.map(fetch, pids))
+
+    def _mass_props_result(self, doc, ws, elem, pid, wvm, state) -> tuple:
+        try:
+            return pid, self.get_mass_props(doc, ws, elem, pid, wvm=wvm, state=state), None
+        except Exception as exc:
+            return pid, None, exc
+
+    def iter_mass_props(self, doc, ws, elem, pids,
+                        batched: bool = BATCH_MASS_PROPS,
+                        max_in_flight: int = MAX_IN_FLIGHT,
+                        *, wvm="w", state=_MISS):
+        """get_all_mass_props as a generator: ``(pid, MassProps | None, error)``
+        in *completion* order, as soon as each part is known.
+
+        At most 2×``max_in_flight`` per‑part results are held at a time, so
+        memory doesn't grow with the part count.  Closing the generator early
+        waits only for the requests already running.
+        """
+        pids = list(pids)
+        if not pids:
+            return
+        if state is _MISS:
+            state = self.document_state(doc, ws, wvm=wvm)
+
+        if batched:
+            try:
+                bodies = self.get_partstudio_mass_props(doc, ws, elem, wvm=wvm, state=state)
+            except Exception:
+                bodies = {}
+            missing = []
+            for pid in pids:
+                if pid in bodies:
+                    yield pid, bodies[pid], None
+                else:
+                    missing.append(pid)
+            pids = missing
+            if not pids:
+                return
+
+        workers = max(1, min(max_in_flight, len(pids)))
+        with ThreadPoolExecutor(max_workers=workers, initializer=set_lane,
+                                initargs=(current_lane(),)) as pool:
+            pending = set()
+            try:
+                for pid in pids:
+                    while len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                    pending.add(pool.submit(self._mass_props_result, doc, ws, elem, pid, wvm, state))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in pending:              # closed early: drop what hasn't started
+                    future.cancel()
+
+    def get_mass_props_batched(self, doc, ws, elem, pids,
+                               max_in_flight: int = MAX_IN_FLIGHT,
+                               *, wvm="w", state=_MISS) -> list:
+        """Same contract as get_mass_props_many, but a single part‑studio request.
+
+        Parts missing from the batched reply (or all of them, if that call
+        fails) are fetched per part.
+        """
+        pids = list(pids)
+        if not pids:
+            return []
+        if state is _MISS:
+            state = self.document_state(doc, ws, wvm=wvm)
+
+        try:
+            bodies = self.get_partstudio_mass_props(doc, ws, elem, wvm=wvm, state=state)
+        except Exception:
+            bodies = {}
+
+        results = {pid: (pid, bodies[pid], None) for pid in pids if pid in bodies}
+        missing = [pid for pid in pids if pid not in results]
+        for res in self.get_mass_props_many(doc, ws, elem, missing, max_in_flight,
+                                            wvm=wvm, state=state):
+            results[res[0]] = res
+        return [results[pid] for pid in pids]
+
+    def get_all_mass_props(self, doc, ws, elem, pids,
+                           batched: bool = BATCH_MASS_PROPS,
+                           max_in_flight: int = MAX_IN_FLIGHT,
+                           *, wvm="w", state=_MISS) -> list:
+        if batched:
+            return self.get_mass_props_batched(doc, ws, elem, pids, max_in_flight,
+                                               wvm=wvm, state=state)
+        return self.get_mass_props_many(doc, ws, elem, pids, max_in_flight,
+                                        wvm=wvm, state=state)
+
+    def warm_up(self, connections: int = None) -> None:
+        """Open up to ``connections`` keep‑alive sockets ahead of real traffic.
+
+        The HEADs run concurrently so each one checks out its own connection;
+        failures are ignored – warm‑up is best effort.
+        """
+        if self.traffic == "replay":
+            return                                  # nothing to connect to
+        n = max(1, min(connections or self.pool_size, self.pool_size))
+
+        def ping(_):
+            try:
+                self._session().head(self.base_url + "/", timeout=self.timeout)
+            except requests.RequestException:
+                pass
+
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(ping, range(n)))
+
+    def close(self) -> None:
+        self._adapter.close()
+
+
+default_client = OnshapeClient()
+
+REGISTRY.collector("onshape_cache", "Response cache (Onshape_Cache) statistic.",
+                   lambda: default_client.cache.stats(), counters=("hits", "misses", "evictions"))
+REGISTRY.collector("onshape_limiter", "Rate limiter (Onshape_Rate_Limiter) statistic.",
+                   lambda: default_client.limiter.stats(), counters=("granted", "throttled"))
+REGISTRY.collector("onshape_coalescing", "Request coalescing (Onshape_Coalescing) statistic.",
+                   lambda: default_client.inflight.stats(), counters=("leaders", "coalesced"))
+
+# ────────────────────────────────────────────────────────────────
+#  Module‑level helpers (same signatures the apps always used)
+#  Pass ``state=default_client.document_state(…)`` to read several things
+#  about one model at the same microversion, with one lookup.
+# ────────────────────────────────────────────────────────────────
+
+def get_parts(doc, ws, elem, *, wvm="w", state=_MISS):
+    return default_client.get_parts(doc, ws, elem, wvm=wvm, state=state)
+
+
+def get_bounding_box(doc, ws, elem, *, wvm="w", state=_MISS):
+    return default_client.get_bounding_box(doc, ws, elem, wvm=wvm, state=state)
+
+
+def get_all_mass_props(doc, ws, elem, pids, batched: bool = BATCH_MASS_PROPS,
+                       max_in_flight: int = MAX_IN_FLIGHT, *, wvm="w", state=_MISS):
+    return default_client.get_all_mass_props(doc, ws, elem, pids, batched, max_in_flight,
+                                             wvm=wvm, state=state)
+
+
+def iter_mass_props(doc, ws, elem, pids, batched: bool = BATCH_MASS_PROPS,
+                    max_in_flight: int = MAX_IN_FLIGHT, *, wvm="w", state=_MISS):
+    return default_client.iter_mass_props(doc, ws, elem, pids, batched, max_in_flight,
+                                          wvm=wvm, state=state)
+
+
+def parse_link_wvm(link: str):
+    """``…/documents/<doc>/<w|v|m>/<id>/e/<elem>`` → (doc, wvm, id, elem)."""
+    parts = urlparse(link).path.strip('/').split('/')
+    try:
+        i    = parts.index('documents')
+        doc  = parts[i + 1]
+        wvm  = parts[i + 2]                             # workspace / version / microversion
+        ws   = parts[i + 3]
+        elem = parts[parts.index('e') + 1]
+    except (ValueError, IndexError):
+        raise ValueError("Invalid Onshape URL")
+    if wvm not in ("w", "v", "m"):
+        raise ValueError("Invalid Onshape URL")
+    return doc, wvm, ws, elem
@@ -0,0 +1,65 @@
+"""
+In‑flight request coalescing ("singleflight") for Onshape lookups.
+
+When several threads ask for the same resource at the same time – a team
+sharing one link, a double‑clicked Evaluate – only the first one goes
+upstream; the rest wait for it and get the same parsed result (or the same
+exception).  Nothing is remembered once the call finishes; that's what
+Onshape_Cache is for.
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done  = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self._calls    = {}                         # key → _Call in progress
+        self.leaders   = 0                          # calls that really ran
+        self.coalesced = 0                          # calls that piggy‑backed on one
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless a call for ``key`` is already running; share its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leaders":   self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,241 @@
+"""
+Local stand‑in for the few Onshape endpoints this project calls.
+
+For benchmarks and offline runs – point ONSHAPE_BASE_URL at it:
+
+    python Onshape_Fake_Server.py --port 8765 --parts 20 --latency 0.05 --error-rate 0.02
+
+Serves, for any document / workspace / element id:
+    GET  /api/parts/d/…/{w|v|m}/…/e/…                          → ``parts`` parts
+    GET  /api/parts/d/…/e/…/partid/<pid>/massproperties        → one part
+    GET  /api/partstudios/d/…/e/…/massproperties               → every body
+    GET  /api/partstudios/d/…/e/…/boundingboxes                → around every body
+    GET  /api/documents/d/<doc>/w/<ws>/currentmicroversion
+    HEAD /                                                     (connection warm‑up)
+
+Every GET must carry a valid Onshape HMAC signature (Authorization
+``On <access>:HmacSHA256:<base64>``, 25‑character On‑Nonce, RFC 1123 Date)
+made with the server's key pair, or it gets a 401 and is counted in
+``stats()["bad_signatures"]``.  ``latency`` (± ``jitter``) is added to every
+response and ``error_rate`` of them fail with ``error_status``; stats() also
+counts the requests each endpoint answered (``"studio_mass"``, …).
+
+solution(parts) gives the served model in the evaluator's SOLUTION format, so
+a contest problem can be registered that the fake model actually solves.
+"""
+
+import argparse, base64, hashlib, hmac, json, random, re, threading, time
+from email.utils import parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+ACCESS_KEY = "fake-access-key"
+SECRET_KEY = "fake-secret-key"
+
+_AUTH  = re.compile(r"^On (?P<access>[^:]+):HmacSHA256:(?P<signature>[A-Za-z0-9+/=]+)$")
+_NONCE = re.compile(r"^[A-Za-z0-9]{25}$")
+_ELEMENT = r"/d/(?P<doc>\w+)/(?P<wvm>[wvm])/(?P<ws>\w+)/e/(?P<elem>\w+)"
+_ROUTES = (
+    ("parts",      re.compile(rf"^/api/parts{_ELEMENT}$")),
+    ("part_mass",  re.compile(rf"^/api/parts{_ELEMENT}/partid/(?P<pid>[^/]+)/massproperties$")),
+    ("studio_mass", re.compile(rf"^/api/partstudios{_ELEMENT}/massproperties$")),
+    ("studio_bbox", re.compile(rf"^/api/partstudios{_ELEMENT}/boundingboxes$")),
+    ("microversion", re.compile(r"^/api/documents/d/(?P<doc>\w+)/w/(?P<ws>\w+)/currentmicroversion$")),
+)
+
+
+def check_signature(method: str, url: str, headers, access_key: str, secret_key: str) -> str:
+    """None if ``headers`` are a valid Onshape signature for the request, else why not."""
+    match = _AUTH.match(headers.get("Authorization", ""))
+    if match is None:
+        return "malformed Authorization"
+    if match["access"] != access_key:
+        return "unknown access key"
+    nonce = headers.get("On-Nonce", "")
+    if not _NONCE.match(nonce):
+        return "malformed On-Nonce"
+    date = headers.get("Date", "")
+    try:
+        parsedate_to_datetime(date)
+    except (TypeError, ValueError):
+        return "malformed Date"
+
+    parts = urlsplit(url)
+    string_to_sign = "\n".join([method, nonce, date, headers.get("Content-Type", ""),
+                                parts.path, parts.query]) + "\n"
+    expected = base64.b64encode(hmac.new(secret_key.encode(), string_to_sign.lower().encode(),
+                                         hashlib.sha256).digest()).decode()
+    if not hmac.compare_digest(expected, match["signature"]):
+        return "signature mismatch"
+    return None
+
+
+def _part(index: int) -> tuple:
+    """(partId, SI mass properties) – a different little solid for every index."""
+    volume = (index + 1) * 1e-9                     # m³
+    return f"J{index:04d}", {
+        "volume":   [volume, volume, volume],
+        "mass":     [volume * 7850, volume * 7850, volume * 7850],
+        "centroid": [index * 1e-3, 0.0, 3e-4, index * 1e-3, 0.0, 3e-4, index * 1e-3, 0.0, 3e-4],
+    }
+
+
+def solution(parts: int) -> list:
+    """The ``parts``‑part model as SOLUTION dicts (mm³, g, mm), one per part."""
+    out = []
+    for i in range(parts):
+        props = _part(i)[1]
+        out.append({"volume":   props["volume"][0] * 1e9,
+                    "mass":     props["mass"][0] * 1000,
+                    "centroid": [c * 1000 for c in props["centroid"][:3]]})
+    return out
+
+
+def _bounding_box(parts: int) -> dict:
+    """Box around every part, each a cube of its volume centred on its centroid."""
+    low, high = [float("inf")] * 3, [float("-inf")] * 3
+    for i in range(parts):
+        props = _part(i)[1]
+        half  = props["volume"][0] ** (1 / 3) / 2
+        for axis, c in enumerate(props["centroid"][:3]):
+            low[axis], high[axis] = min(low[axis], c - half), max(high[axis], c + half)
+    return dict(zip(("lowX", "lowY", "lowZ", "highX", "highY", "highZ"), low + high))
+
+
+class FakeOnshape:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, parts: int = 1,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, access_key: str = ACCESS_KEY,
+                 secret_key: str = SECRET_KEY):
+        self.parts, self.latency, self.jitter = parts, latency, jitter
+        self.error_rate, self.error_status = error_rate, error_status
+        self.access_key, self.secret_key = access_key, secret_key
+        self.microversion = "mv0"
+        self._counts = {"requests": 0, "errors": 0, "bad_signatures": 0,
+                        **{name: 0 for name, _ in _ROUTES}}
+        self._lock   = threading.Lock()
+        self._httpd  = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOnshape":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True,
+                                        name="fake-onshape")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    # request handling --------------------------------------------------
+
+    def respond(self, method: str, url: str, headers) -> tuple:
+        """``(status, body)`` for one request – the whole fake API."""
+        self._count("requests")
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if check_signature(method, url, headers, self.access_key, self.secret_key):
+            self._count("bad_signatures")
+            return 401, {"message": "Unauthenticated"}
+        if self.error_rate and random.random() < self.error_rate:
+            self._count("errors")
+            return self.error_status, {"message": "Injected failure"}
+
+        path = urlsplit(url).path
+        for name, pattern in _ROUTES:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            self._count(name)
+            if name == "microversion":
+                return 200, {"microversion": self.microversion}
+            if name == "parts":
+                return 200, [{"partId": _part(i)[0], "name": f"Part {i + 1}", "bodyType": "solid"}
+                             for i in range(self.parts)]
+            if name == "studio_bbox":
+                return 200, _bounding_box(self.parts)
+            bodies = dict(_part(i) for i in range(self.parts))
+            if name == "studio_mass":
+                return 200, {"bodies": bodies}
+            body = bodies.get(match["pid"])
+            if body is None:
+                return 404, {"message": "Part not found"}
+            return 200, {"bodies": {match["pid"]: body}}
+        return 404, {"message": "Not found"}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"           # keep‑alive, like the real API
+            disable_nagle_algorithm = True          # headers + body are two writes
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                status, body = fake.respond("GET", self.path, self.headers)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--parts", type=int, default=1, help="parts per element (default 1)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds of random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of failed responses")
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args(argv)
+
+    server = FakeOnshape(args.host, args.port, args.parts, args.latency, args.jitter,
+                         args.error_rate, args.error_status)
+    print(f"Fake Onshape on {server.url} – use ONSHAPE_ACCESS_KEY={ACCESS_KEY} "
+          f"ONSHAPE_SECRET_KEY={SECRET_KEY}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
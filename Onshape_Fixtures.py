@@ -0,0 +1,72 @@
+"""
+On‑disk record/replay of Onshape API responses.
+
+    ONSHAPE_TRAFFIC=record ONSHAPE_FIXTURES=fixtures/ python Onshape_Model_Evaluator_Flask.py
+    … use the app against the real API …
+    ONSHAPE_TRAFFIC=replay ONSHAPE_FIXTURES=fixtures/ gunicorn … Onshape_Model_Evaluator_Flask:app
+
+record  every successful reply that get_json fetches is saved as one JSON
+        file per request path (host independent): status, Content‑Type,
+        body and the measured latency.  Only the response is kept – the
+        signed request headers (Authorization, On‑Nonce, Date) never are.
+replay  replies come from the fixture files, after sleeping the recorded
+        latency × ONSHAPE_REPLAY_SPEED; nothing is sent to Onshape, so no
+        API quota is spent.  A request that was never recorded raises
+        FixtureMissing.
+
+Configuration (environment or .env):
+    ONSHAPE_TRAFFIC       off | record | replay (default off)
+    ONSHAPE_FIXTURES      fixture folder (default fixtures)
+    ONSHAPE_REPLAY_SPEED  latency multiplier in replay, 0 = instant (default 1)
+"""
+
+import base64, hashlib, json, os, tempfile, time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()                                           # settings below are read at import
+
+TRAFFIC      = os.getenv("ONSHAPE_TRAFFIC", "off")
+FOLDER       = os.getenv("ONSHAPE_FIXTURES", "fixtures")
+REPLAY_SPEED = float(os.getenv("ONSHAPE_REPLAY_SPEED", "1"))
+
+
+class FixtureMissing(LookupError):
+    """Replay mode was asked for a request that was never recorded."""
+
+
+class FixtureStore:
+    def __init__(self, folder: str = FOLDER, replay_speed: float = REPLAY_SPEED):
+        self.folder       = folder
+        self.replay_speed = replay_speed
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, request_path: str) -> str:
+        return os.path.join(self.folder, hashlib.sha256(request_path.encode()).hexdigest()[:32] + ".json")
+
+    def record(self, request_path: str, res) -> None:
+        """Save a requests.Response for ``request_path`` (path + query, no host)."""
+        entry = {
+            "path":         request_path,
+            "status":       res.status_code,
+            "content_type": res.headers.get("Content-Type"),
+            "latency":      res.elapsed.total_seconds(),
+            "recorded_at":  datetime.now(timezone.utc).isoformat(),
+            "body":         base64.b64encode(res.content).decode(),
+        }
+        # write‑then‑rename: a concurrent replay never sees half a file
+        fd, tmp = tempfile.mkstemp(prefix=".fixture-", dir=self.folder)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(entry, fh)
+        os.replace(tmp, self._path(request_path))
+
+    def replay(self, request_path: str) -> bytes:
+        """Recorded body for ``request_path``, delivered after its recorded latency."""
+        try:
+            with open(self._path(request_path), encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except FileNotFoundError:
+            raise FixtureMissing(f"No recorded response for {request_path}") from None
+        if self.replay_speed > 0:
+            time.sleep(entry["latency"] * self.replay_speed)
+        return base64.b64decode(entry["body"])
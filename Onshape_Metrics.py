@@ -0,0 +1,261 @@
+"""
+Low‑overhead timing instrumentation + Prometheus text exposition.
+
+    with timed("sign"):
+        ...
+
+records the block's duration in ``onshape_stage_seconds{stage="sign"}``
+(a fixed‑bucket histogram), counts it in ``onshape_stage_in_flight`` while it
+runs and, inside a Flask request, adds it to that request's Server‑Timing
+header.  Stages used by the client and the apps:
+
+    sign          build_headers (HMAC)
+    upstream      HTTP round trip until the response headers (connect/TLS included)
+    decode        response JSON decoding
+    get_json      one get_json call – cache hit, coalesced wait or the above
+    get_parts / get_mass_props / get_bounding_box
+    grade         one contest grading job (Contest_Jobs worker), Onshape calls included
+    match         the grading computation itself (GradingEngine.match)
+    render        page template rendering
+
+``install(app)`` adds /metrics (Prometheus text format 0.0.4), a per‑endpoint
+request histogram and – when METRICS_SERVER_TIMING=1 – the Server‑Timing
+response header.  Upstream status codes are counted in
+``onshape_upstream_responses_total{status=…}``.
+
+Everything is per process: under gunicorn, scrape each worker (or accept
+that /metrics shows the worker that answered).  Each observation is a
+perf_counter() pair, one bisect and a short lock – cheap enough to leave on.
+"""
+
+import os, threading, time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+load_dotenv()                                           # SERVER_TIMING is read at import
+
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0") == "1"
+
+# seconds; covers the sub‑millisecond signing up to slow Onshape calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0)
+
+_timings = ContextVar("server_timing", default=None)   # stage → [seconds, count]
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{str(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values = {}
+        self._lock   = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self._inc(_labels(labels), amount)
+
+    def _inc(self, key: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(buckets)
+        self._series = {}                           # labels → [bucket counts…, sum, count]
+        self._lock   = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        self._observe(_labels(labels), value)
+
+    def _observe(self, key: tuple, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        out = []
+        for key, series in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                out.append((self.name + "_bucket", key, cumulative, f'le="{bound}"'))
+            out.append((self.name + "_bucket", key, series[-1], 'le="+Inf"'))
+            out.append((self.name + "_sum", key, series[-2]))
+            out.append((self.name + "_count", key, series[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics    = []
+        self._collectors = []                       # (prefix, help, fn → {name: number})
+        self._lock       = threading.Lock()
+
+    def add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def collector(self, prefix: str, help: str, fn, counters=()) -> None:
+        """Expose ``fn()``'s numeric values (e.g. a stats() dict) as ``<prefix>_<key>`` gauges.
+
+        Keys in ``counters`` only ever go up; they become ``<prefix>_<key>_total``
+        counters, so rate() works on them.
+        """
+        with self._lock:
+            self._collectors.append((prefix, help, fn, frozenset(counters)))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value, *extra in metric.samples():
+                lines.append(f"{name}{_format_labels(key, *extra)} {value}")
+        for prefix, help, fn, counters in collectors:
+            try:
+                values = fn()
+            except Exception:
+                continue                            # a broken collector mustn't break /metrics
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name, kind = (f"{prefix}_{key}_total", "counter") if key in counters \
+                    else (f"{prefix}_{key}", "gauge")
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.add(Histogram(
+    "onshape_stage_seconds", "Time spent per instrumented stage."))
+STAGE_IN_FLIGHT = REGISTRY.add(Gauge(
+    "onshape_stage_in_flight", "Instrumented stages currently running."))
+UPSTREAM_RESPONSES = REGISTRY.add(Counter(
+    "onshape_upstream_responses_total", "Onshape API responses by HTTP status (error = no response)."))
+HTTP_SECONDS = REGISTRY.add(Histogram(
+    "http_request_seconds", "Flask request duration by endpoint and status."))
+
+
+class timed:
+    """``with timed(stage):`` – histogram, in‑flight gauge and Server‑Timing for a block.
+
+    A plain class rather than @contextmanager: this wraps every signed
+    request, so it skips the generator machinery and label sorting.
+    """
+
+    __slots__ = ("stage", "key", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.key   = (("stage", stage),)
+
+    def __enter__(self):
+        STAGE_IN_FLIGHT._inc(self.key)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        took = time.perf_counter() - self.start
+        STAGE_IN_FLIGHT._inc(self.key, -1)
+        STAGE_SECONDS._observe(self.key, took)
+        timings = _timings.get()
+        if timings is not None:
+            entry = timings.get(self.stage)
+            if entry is None:
+                timings[self.stage] = [took, 1]
+            else:
+                entry[0] += took
+                entry[1] += 1
+        return False
+
+
+def count_upstream(status) -> None:
+    UPSTREAM_RESPONSES.inc(status=status)
+
+
+def server_timing(timings: dict, total: float) -> str:
+    """``stage;dur=ms;desc="n×"`` entries, plus the whole request as ``total``."""
+    entries = [f'{stage};dur={seconds * 1e3:.2f}' + (f';desc="{n}x"' if n > 1 else "")
+               for stage, (seconds, n) in timings.items()]
+    entries.append(f"total;dur={total * 1e3:.2f}")
+    return ", ".join(entries)
+
+
+def install(app, server_timing_header: bool = SERVER_TIMING) -> None:
+    """/metrics route, request histogram and the optional Server‑Timing header."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timing():
+        g.metrics_start = time.perf_counter()
+        g.metrics_token = _timings.set({})
+
+    @app.after_request
+    def _finish_timing(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        HTTP_SECONDS.observe(total, endpoint=request.endpoint or "unknown",
+                             status=response.status_code)
+        if server_timing_header:
+            response.headers["Server-Timing"] = server_timing(_timings.get() or {}, total)
+        return response
+
+    @app.teardown_request
+    def _reset_timing(exc=None):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            try:
+                _timings.reset(token)
+            except ValueError:
+                pass                                # streamed response: torn down elsewhere
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -2,7 +2,8 @@
 Very small Flask app for running an Onshape‑based, 60‑minute modelling contest on a LAN.
 
 • Upload a reference image of the drawing people need to model.
-• Click the *Start Contest* button – a 60 min countdown begins.
+• Click the *Start Contest* button – a 60 min countdown begins (CONTEST_MINUTES in the
+  environment or .env sets another length).
 • While the timer is running, participants paste a public Onshape URL and hit *Evaluate*.
 • The app fetches mass‑properties exactly like the original Mass_Properties_viewer_flask.py
   and compares them against hard‑coded solution numbers.
@@ -11,27 +12,63 @@ Very small Flask app for running an Onshape‑based, 60‑minute modelling conte
 NOTE
 ====
 * Replace the numbers inside SOLUTION with the correct reference values for your contest.
-* The auth helpers (build_headers, etc.) were copied verbatim from the working script.
-* No database/session handling – state is kept in process memory (fine for a local event).
+  For a multi‑part model make SOLUTION a list with one such dict per body: every part
+  is measured and the parts are paired with the bodies whatever order they are listed in.
+* The auth helpers (build_headers, OnshapeClient, …) live in Onshape_Client.py, shared with
+  the viewer and the CLI script; its connection pool is warmed up when the contest starts.
+* Contest timing, per‑participant messages and submission records live in Contest_State.py
+  (SQLite/WAL by default), so the app can run under gunicorn with several workers.
+  Participants are told apart by a random "participant" cookie – no login.
+* /evaluate only queues the submission (Contest_Jobs.py); the verdict, the countdown and
+  contest start/end are pushed to the page over Server‑Sent Events (/events,
+  Contest_Events.py).  Submissions are timed from when they were accepted.
+  Run it as ``gunicorn -k gevent -w 4 Onshape_Model_Evaluator_Flask:app`` so open
+  streams cost a greenlet each; on sync workers /events is off and pages poll.
+  GET /contest answers the same contest snapshot as JSON (running, remaining_seconds,
+  contest_end).
+* /leaderboard ranks participants by first perfect match, then closest attempt
+  (Contest_Leaderboard.py); add ``Accept: application/json`` for the raw snapshot.
+* Grading is done by Contest_Grading.py (NumPy).  Every submission's measured values
+  are kept, so after correcting SOLUTION (and restarting) a POST to /regrade re‑grades
+  all of them at once and the leaderboard follows.  Submissions cut by a pre‑check
+  keep their part count and bounding box: /regrade checks those again, and queues the
+  ones that pass now for a full grading of their link (a workspace link is graded as
+  it is then – Onshape is asked again, unlike for the others).
+* Grading is a cascade: the part count (free – it comes with the part list), then the
+  part studio's bounding box against SOLUTION, and only then the expensive
+  mass‑properties call.  A stage that fails answers straight away;
+  contest_cascade_total{stage, result} counts what each stage cut off.
+* /metrics exposes stage timings, upstream status counts and queue depth in Prometheus
+  text format (Onshape_Metrics.py).
+* Uploaded drawings are streamed to disk with a size limit and served as small,
+  content‑hashed WebP variants with immutable cache headers (Contest_Drawing.py).
+* Page templates are compiled once at import.  The contest page that most people see
+  (no pending message) is rendered once per contest state and served with
+  ETag/Last‑Modified, so reloads in the start‑of‑contest rush are mostly 304s.
 """
 
 from flask import (
-    Flask, request, render_template_string,
-    redirect, url_for
+    Flask, request, render_template,
+    redirect, url_for, jsonify, g, Response, send_from_directory
 )
-import os, hmac, hashlib, base64, random, string, requests
-from urllib.parse import urlparse
-from email.utils import formatdate
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-
-load_dotenv()                                           # .env support
-
-ACCESS_KEY = os.getenv("ONSHAPE_ACCESS_KEY")
-SECRET_KEY = os.getenv("ONSHAPE_SECRET_KEY")
+import hashlib, os, threading, uuid
+from markupsafe import escape
+from datetime import datetime, timedelta, timezone
+from Onshape_Client import (
+    default_client, get_parts, get_all_mass_props, get_bounding_box, parse_link_wvm
+)
+from Onshape_Rate_Limiter import LANE_CONTEST, set_lane
+from Contest_Jobs import JobQueue, QueueFull
+from Contest_State import open_store, submission_record
+from Contest_Events import Broadcaster, contest_event, streaming_ok
+from Contest_Leaderboard import Leaderboard
+from Contest_Grading import GradingEngine, regrade_store
+from Contest_Drawing import process_upload, UploadError, MAX_BYTES as DRAWING_MAX_BYTES
+from Onshape_Metrics import REGISTRY, Counter, install as install_metrics, timed
 
 UPLOAD_FOLDER = "static"                                 # where the drawing image lives
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+CONTEST_LENGTH = timedelta(minutes=float(os.getenv("CONTEST_MINUTES", "60")))
 
 # ────────────────────────────────────────────────────────────────
 #  Hard‑coded correct solution values – EDIT THESE
@@ -41,110 +78,199 @@ SOLUTION = {
     "mass": 0.10635,               # in g
     "centroid": [0, 0, 0.3] # X, Y, Z in mm
 }
+TOLERANCE = 1e-4                 # absolute, per field (a {"volume": …, "cx": …} dict works too)
+PARTS     = 1 if isinstance(SOLUTION, dict) else len(SOLUTION)   # parts the model must have
+PROBLEM   = "contest"
 
 # ────────────────────────────────────────────────────────────────
-#  Helpers copied verbatim from the working CLI/Flask script
+#  Flask state
 # ────────────────────────────────────────────────────────────────
+app          = Flask(__name__)
+# werkzeug refuses anything far bigger outright; Contest_Drawing enforces the exact limit
+app.config["MAX_CONTENT_LENGTH"] = DRAWING_MAX_BYTES + 1024 * 1024
+# the drawing's content‑hashed variants – next to the app, like send_from_directory
+# resolves it, not in whatever directory the server was started from
+DRAWING_FOLDER = os.path.join(app.root_path, UPLOAD_FOLDER, "drawings")
+store        = open_store()   # contest_end / drawing_file / messages / submissions
+_save_job    = lambda job: store.save_submission(submission_record(job))
+# graders run in the contest lane – ahead of viewer/CLI traffic at the rate limiter
+jobs         = JobQueue(initializer=set_lane, initargs=(LANE_CONTEST,),
+                        on_accept=_save_job, on_done=_save_job)
+broadcaster  = Broadcaster(store)   # /events: countdown + verdict push
+leaderboard  = Leaderboard(store)   # /leaderboard
+grader       = GradingEngine()
+grader.add_problem(PROBLEM, SOLUTION, abs_tol=TOLERANCE)
+
+install_metrics(app)                # /metrics (+ Server‑Timing with METRICS_SERVER_TIMING=1)
+REGISTRY.collector("contest_jobs", "Grading queue (Contest_Jobs) statistic.",
+                   lambda: {"queue_depth": jobs.depth()})
+CASCADE = REGISTRY.add(Counter(
+    "contest_cascade_total", "Submissions leaving each grading stage, cut off or passed on."))
+
+PARTICIPANT_COOKIE = "participant"
 
-def _random_nonce(length: int = 25) -> str:
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
-
-def build_headers(method: str, url: str,
-                  access_key: str = ACCESS_KEY,
-                  secret_key: str = SECRET_KEY) -> dict:
-    parsed = urlparse(url)
-    path, query = parsed.path, parsed.query or ""
-
-    nonce = _random_nonce()                           # single nonce
-    date  = formatdate(localtime=False, usegmt=True)
-    ctype = ""
-
-    string_to_sign = "\n".join([
-        method,
-        nonce,
-        date,
-        ctype,
-        path,
-        query
-    ]) + "\n"
-
-    signature = base64.b64encode(
-        hmac.new(secret_key.encode(),
-                 string_to_sign.lower().encode(),
-                 hashlib.sha256).digest()
-    ).decode()
+# ────────────────────────────────────────────────────────────────
+#  Utility helpers
+# ────────────────────────────────────────────────────────────────
 
-    return {
-        "Authorization": f"On {access_key}:HmacSHA256:{signature}",
-        "On-Nonce": nonce,                          # same nonce!
-        "Date": date,
-        "Accept": "application/json"
-    }
+def allowed_file(filename: str) -> bool:
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def get_json(url: str) -> dict:
-    res = requests.get(url, headers=build_headers("GET", url))
-    res.raise_for_status()
-    return res.json()
+def participant_id() -> str:
+    if "participant" not in g:
+        cookie = request.cookies.get(PARTICIPANT_COOKIE, "")
+        g.participant = cookie if 0 < len(cookie) <= 64 else uuid.uuid4().hex
+    return g.participant
 
 
-def get_parts(doc, ws, elem):
-    return get_json(f"https://cad.onshape.com/api/parts/d/{doc}/w/{ws}/e/{elem}")
+def notify(html: str) -> None:
+    """One‑shot message for the current participant's next page load."""
+    store.push_message(participant_id(), html)
 
 
-def get_mass_props(doc, ws, elem, pid):
-    return get_json(f"https://cad.onshape.com/api/parts/d/{doc}/w/{ws}/e/{elem}/partid/{pid}/massproperties")
+def wants_json() -> bool:
+    return request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html
 
 
-def chunk_list(lst, n):                             # same as CLI
-    return [lst[i:i+n] for i in range(0, len(lst), n)]
+def reject(text: str, status: int):
+    """Refuse a form post: JSON error for fetch() callers, message + redirect otherwise."""
+    if wants_json():
+        return jsonify({"error": text}), status
+    notify(text)
+    return redirect(url_for("index"))
 
 
-def parse_link(link: str):
-    parts = urlparse(link).path.strip('/').split('/')
+def drawing_modified(filename):
+    """UTC mtime of the uploaded drawing (None if there isn't one)."""
     try:
-        doc  = parts[parts.index('documents') + 1]
-        ws   = parts[parts.index('w') + 1]           # could be 'v'
-        elem = parts[parts.index('e') + 1]
-        return doc, ws, elem
-    except (ValueError, IndexError):
-        raise ValueError("Invalid Onshape URL")
-
-# ────────────────────────────────────────────────────────────────
-#  Flask state
-# ────────────────────────────────────────────────────────────────
-app          = Flask(__name__)
-contest_end  = None       # datetime when contest ends (UTC)
-drawing_file = None       # filename inside static/
-message      = ""         # feedback shown to users
-
-# ────────────────────────────────────────────────────────────────
-#  Utility helpers
-# ────────────────────────────────────────────────────────────────
-
-def allowed_file(filename: str) -> bool:
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+        mtime = os.path.getmtime(os.path.join(DRAWING_FOLDER, filename)) if filename else None
+    except OSError:
+        return None
+    return datetime.fromtimestamp(mtime, timezone.utc) if mtime else None
+
+
+@app.after_request
+def remember_participant(response):
+    if "participant" in g and request.cookies.get(PARTICIPANT_COOKIE) != g.participant:
+        response.set_cookie(PARTICIPANT_COOKIE, g.participant,
+                            max_age=7 * 24 * 3600, httponly=True, samesite="Lax")
+    return response
+
+
+class Rejected(Exception):
+    """A pre‑check ruled the submission out; the message is shown as the verdict."""
+
+
+def precheck(doc, wvm, ws, elem, state, checks: dict) -> list:
+    """Cheap stages before mass properties; returns the parts or raises Rejected.
+
+    1. part count – the part list is needed anyway, so this one is free
+    2. bounding box – one light call, checked by GradingEngine.check_box
+
+    What they saw goes into ``checks`` (``{"parts", "box"}``), so /regrade can
+    run them again without asking Onshape.
+    """
+    parts = get_parts(doc, ws, elem, wvm=wvm, state=state)
+    if not parts:
+        raise ValueError("No parts found in document.")
+    checks.update(parts=len(parts), box=None)
+    reason = grader.check_parts(PROBLEM, len(parts))
+    CASCADE.inc(stage="parts", result="cut" if reason else "passed")
+    if reason:
+        raise Rejected(reason)
+
+    box = get_bounding_box(doc, ws, elem, wvm=wvm, state=state)
+    checks["box"] = list(box.mm()) if box is not None else None
+    reason = grader.check_box(PROBLEM, *checks["box"]) if box is not None else None
+    CASCADE.inc(stage="bbox", result="cut" if reason else "passed")
+    if reason:
+        raise Rejected(reason)
+    return parts
+
+
+def grade_link(link: str) -> dict:
+    """Fetch the submitted model and compare it with SOLUTION.
+
+    Returns ``{"message": feedback HTML, "solved": bool | None, "score": float | None,
+    "problem", "measured": [[volume, mass, cx, cy, cz] per part] | None, "checks":
+    {"parts", "box"} | None}`` (None when the model couldn't be graded; a
+    pre‑check rejection is unsolved with no score, and keeps only ``checks``).
+    Runs on a Contest_Jobs worker thread, never inside a request.
+    """
+    solved = score = measured = None
+    checks = {}
+    with timed("grade"):
+        try:
+            doc, wvm, ws, elem = parse_link_wvm(link)
+
+            # one microversion lookup for the whole grading: every read below
+            # sees the same version of the model
+            state = default_client.document_state(doc, ws, wvm=wvm)
+            parts = precheck(doc, wvm, ws, elem, state, checks)
+
+            # every part at once – one part‑studio call, per‑part fan‑out for the rest
+            results = get_all_mass_props(doc, ws, elem, [p.part_id for p in parts],
+                                         wvm=wvm, state=state)
+            measured = []
+            for part, (_, props, err) in zip(parts, results):
+                if err is not None or props is None:
+                    raise ValueError(
+                        f"Mass-properties unavailable for {escape(part.name or part.part_id)}.")
+                volume_mm3, mass_g, centroid_mm = props.mm()
+                measured.append([volume_mm3, mass_g, *centroid_mm])
+
+            with timed("match"):
+                match = grader.match(PROBLEM, measured)
+            solved, score = match.ok, match.score
+            CASCADE.inc(stage="massprops", result="passed" if solved else "cut")
+            if solved:
+                message = (
+                    "<span style='color:green; font-size:20px;'>🎉 "
+                    "Congratulations – perfect match!</span>"
+                )
+            else:
+                lines = []
+                for part, deltas, within in zip(parts, match.deltas, match.within):
+                    if within.all():
+                        continue
+                    delta = (
+                        f"Volume Δ: {deltas[0]:.6g} mm³, "
+                        f"Mass Δ: {deltas[1]:.6g} g, "
+                        f"Centroid Δ: {[round(float(d), 6) for d in deltas[2:]]}"
+                    )
+                    lines.append(f"{escape(part.name)}: {delta}" if PARTS > 1 else delta)
+                message = (
+                    "<span style='color:red;'>❌ Mass-properties do not match.<br>"
+                    + "<br>".join(lines) +
+                    "</span>"
+                )
+
+        except Rejected as exc:
+            solved  = False
+            message = f"<span style='color:red;'>❌ {exc}</span>"
+        except Exception as exc:
+            message = f"<span style='color:red;'>Error: {exc}</span>"
+
+    return {"message": message, "solved": solved, "score": score,
+            "problem": PROBLEM, "measured": measured, "checks": checks or None}
 
 
 # ────────────────────────────────────────────────────────────────
-#  Routes
+#  Page templates – compiled once at import, not on every request
 # ────────────────────────────────────────────────────────────────
-
-@app.route('/', methods=['GET'])
-def index():
-    global message
-
-    running = contest_end is not None and datetime.utcnow() < contest_end
-    remaining_seconds = int((contest_end - datetime.utcnow()).total_seconds()) if running else 0
-
-    html = render_template_string('''
+INDEX_PAGE = app.jinja_env.from_string('''
     <!doctype html>
     <title>Onshape 3D‑Model Contest</title>
     <h2>Onshape 3D‑Model Contest</h2>
+    <p><a href="{{ url_for('leaderboard_page') }}">Leaderboard</a></p>
 
     {% if drawing %}
         <p><b>Reference drawing:</b></p>
-        <img src="{{ url_for('static', filename=drawing) }}" style="max-width:500px; border:1px solid #ccc; padding:4px;">
+        <img src="{{ url_for('drawing_image', name=drawing) }}" srcset="{{ srcset }}"
+             sizes="(max-width: 520px) 100vw, 500px"
+             {% if size[0] %}width="{{ size[0] }}" height="{{ size[1] }}"{% endif %}
+             style="max-width:500px; height:auto; border:1px solid #ccc; padding:4px;">
     {% else %}
         <form method="post" action="{{ url_for('upload') }}" enctype="multipart/form-data">
             <b>Upload reference drawing:</b>
@@ -154,153 +280,306 @@ def index():
         <hr>
     {% endif %}
 
-    {% if not running %}
+    <div id="idle" {% if running %}hidden{% endif %}>
         <form method="post" action="{{ url_for('start') }}">
             <button type="submit" style="font-size:28px; padding:20px 40px;">Start Contest</button>
         </form>
-    {% else %}
-        <p><b>Time remaining: <span id="count">{{ remaining }}</span></b></p>
-        <form method="post" action="{{ url_for('evaluate') }}">
+    </div>
+    <div id="live" {% if not running %}hidden{% endif %}>
+        <p><b>Time remaining: <span id="count"></span></b></p>
+        <form id="evaluate" method="post" action="{{ url_for('evaluate') }}">
+            <input name="name" size="20" placeholder="Your name">
             <input name="link" size="80" placeholder="Paste Onshape public link here" required>
             <button type="submit">Evaluate</button>
         </form>
-    {% endif %}
+    </div>
 
     {% if message %}
         <hr><div>{{ message|safe }}</div>
     {% endif %}
 
-    {% if running %}
+    <div id="verdict-box" {% if not job %}hidden{% endif %}>
+        <hr><div id="verdict">Evaluating your submission…</div>
+    </div>
+
     <script>
-        var seconds = {{ remaining_seconds }};
-        function tick() {
-            if (seconds <= 0) { location.reload(); return; }
-            seconds--;
+        // Countdown, contest start/end and verdicts all arrive over /events –
+        // no polling and no page reloads.
+        // the page is cached, so count from contest_end; the first
+        // /events snapshot corrects any client clock skew
+        var end     = {{ contest_end|tojson }};
+        var seconds = end ? Math.max(0, Math.round((Date.parse(end) - Date.now()) / 1000)) : 0;
+        var pending = {{ job|tojson }};
+        var seen    = {};
+
+        function show(id, on) { document.getElementById(id).hidden = !on; }
+        function render() {
             var m = Math.floor(seconds / 60);
             var s = seconds % 60;
             document.getElementById('count').textContent = m + "m " + (s<10?"0":"") + s + "s";
         }
-        setInterval(tick, 1000);
+        function contest(c) {
+            seconds = c.remaining_seconds;
+            show('idle', !c.running);
+            show('live', c.running);
+            render();
+        }
+        function verdict(v) {
+            seen[v.id] = v;
+            if (v.id !== pending) return;
+            var el = document.getElementById('verdict');
+            if (v.status === 'done') { el.innerHTML = v.result; }
+            else                     { el.textContent = "Error: " + v.error; }
+            show('verdict-box', true);
+            pending = null;
+        }
+        function track(id) {
+            pending = id;
+            if (seen[id]) { verdict(seen[id]); return; }
+            // it may have finished before this page's stream was connected
+            fetch("{{ url_for('result', job_id='JOB') }}".replace('JOB', id))
+                .then(function (r) { return r.json(); })
+                .then(function (j) { if (j.status === 'done' || j.status === 'failed') verdict(j); });
+        }
+
+        render();
+        setInterval(function () {
+            if (seconds <= 0) return;
+            seconds--;
+            render();
+            if (seconds === 0) contest({running: false, remaining_seconds: 0});
+        }, 1000);
+
+        var events = new EventSource("{{ url_for('events') }}");
+        events.addEventListener('contest', function (e) { contest(JSON.parse(e.data)); });
+        events.addEventListener('verdict', function (e) { verdict(JSON.parse(e.data)); });
+        events.onopen = function () { if (pending) track(pending); };
+        // no stream (a sync worker answers 204, or the connection is down):
+        // poll for the pending verdict instead
+        setInterval(function () {
+            if (pending && events.readyState !== EventSource.OPEN) track(pending);
+        }, 2000);
+
+        document.getElementById('evaluate').addEventListener('submit', function (e) {
+            e.preventDefault();
+            var el = document.getElementById('verdict');
+            el.textContent = "Evaluating your submission…";
+            show('verdict-box', true);
+            fetch(this.action, {method: 'POST', body: new FormData(this),
+                                headers: {'Accept': 'application/json'}})
+                .then(function (r) { return r.json(); })
+                .then(function (j) { if (j.id) track(j.id); else el.textContent = j.error; });
+        });
     </script>
-    {% endif %}
-    ''',
-        drawing=drawing_file,
+''')
+
+LEADERBOARD_PAGE = app.jinja_env.from_string('''
+    <!doctype html>
+    <title>Leaderboard – Onshape 3D‑Model Contest</title>
+    <meta http-equiv="refresh" content="10">
+    <h2>Leaderboard</h2>
+    <table border="1" cellpadding="4" style="border-collapse:collapse">
+        <tr><th>#</th><th>Name</th><th>Result</th><th>Submitted (UTC)</th></tr>
+        {% for row in board.rows %}
+        <tr>
+            <td>{{ row.rank }}</td>
+            <td>{{ row.name }}</td>
+            <td>{% if row.solved %}🎉 solved{% else %}Δ {{ '%.4g' % row.score }}{% endif %}</td>
+            <td>{{ row.accepted_at[11:19] }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    <p><a href="{{ url_for('index') }}">Back to the contest</a></p>
+''')
+
+_index_shell = None     # (state key, etag, last_modified, html) of the last anonymous render
+
+
+# ────────────────────────────────────────────────────────────────
+#  Routes
+# ────────────────────────────────────────────────────────────────
+
+@app.route('/', methods=['GET'])
+def index():
+    global _index_shell
+    settings    = store.contest()
+    contest_end = settings["contest_end"]
+    drawing     = settings["drawing_file"]
+    running     = contest_end is not None and datetime.utcnow() < contest_end
+
+    drawing_mtime = drawing_modified(drawing)
+    message       = store.pop_message(participant_id())
+    job           = request.args.get("job")
+    context = dict(
+        drawing=drawing,
+        srcset=", ".join(
+            url_for("drawing_image", name=name) + " " + width
+            for name, width in (v.split(" ") for v in (settings["drawing_srcset"] or "").split(", ") if v)
+        ),
+        size=(settings["drawing_size"] or "x").split("x"),
         running=running,
-        remaining=f"{remaining_seconds//60}m {remaining_seconds%60:02d}s" if running else '',
-        remaining_seconds=remaining_seconds,
-        message=message
+        contest_end=contest_end.isoformat() + "Z" if contest_end is not None else None,
     )
 
-    # reset message after showing it once
-    message = ""
-    return html
+    if message or job:                      # personalised – render fresh, never cache
+        with timed("render"):
+            html = render_template(INDEX_PAGE, message=message, job=job, **context)
+        response = app.make_response(html)
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    # Everyone else sees the same page until the contest starts/ends or the
+    # drawing changes: render it once per state and answer repeats with 304.
+    key = (drawing, running, context["contest_end"])
+    if _index_shell is None or _index_shell[0] != key:
+        end     = contest_end.replace(tzinfo=timezone.utc) if contest_end else None
+        changes = [t for t in (drawing_mtime,
+                               end - CONTEST_LENGTH if end else None,
+                               end if end and not running else None) if t]
+        with timed("render"):
+            html = render_template(INDEX_PAGE, message="", job=None, **context)
+        _index_shell = (key, hashlib.sha1(html.encode()).hexdigest()[:16],
+                        max(changes) if changes else None, html)
+    _, etag, last_modified, html = _index_shell
+
+    response = app.make_response(html)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 
 @app.route('/upload', methods=['POST'])
 def upload():
-    global drawing_file, message
     file = request.files.get('photo')
     if not file or file.filename == "":
-        message = "No file selected."
+        notify("No file selected.")
         return redirect(url_for('index'))
 
     if allowed_file(file.filename):
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        if not os.path.exists(UPLOAD_FOLDER):
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        filename = f"drawing.{ext}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        drawing_file = filename
-        message = "Drawing uploaded successfully."
+        try:
+            store.update_contest(**process_upload(file.stream, DRAWING_FOLDER))
+            notify("Drawing uploaded successfully.")
+        except UploadError as exc:
+            notify(str(exc))
     else:
-        message = "Invalid file type."
+        notify("Invalid file type.")
+    return redirect(url_for('index'))
+
+
+@app.errorhandler(413)
+def upload_too_large(exc):
+    notify(f"Drawing is too large (max {DRAWING_MAX_BYTES // (1024 * 1024)} MB).")
     return redirect(url_for('index'))
 
 
+@app.route('/drawings/<name>', methods=['GET'])
+def drawing_image(name):
+    # content‑hashed names never change content – cache for good
+    response = send_from_directory(DRAWING_FOLDER, name, max_age=365 * 24 * 3600)
+    response.cache_control.public    = True
+    response.cache_control.immutable = True
+    return response
+
+
 @app.route('/start', methods=['POST'])
 def start():
-    global contest_end, message
-    contest_end = datetime.utcnow() + timedelta(minutes=60)
-    message = "Contest started – good luck!"
+    store.update_contest(contest_end=datetime.utcnow() + CONTEST_LENGTH)
+    notify("Contest started – good luck!")
+    # open keep‑alive connections now, before the first submissions arrive
+    threading.Thread(target=default_client.warm_up, daemon=True).start()
     return redirect(url_for('index'))
 
 
 @app.route('/evaluate', methods=['POST'])
 def evaluate():
-    global message
-
+    contest_end = store.contest()["contest_end"]
     if contest_end is None or datetime.utcnow() >= contest_end:
-        message = "Contest is not running."
-        return redirect(url_for("index"))
+        return reject("Contest is not running.", 409)
 
     link = request.form.get("link", "").strip()
     if not link:
-        message = "Please provide an Onshape link."
-        return redirect(url_for("index"))
+        return reject("Please provide an Onshape link.", 400)
 
     try:
-        doc, ws, elem = parse_link(link)
-
-        parts = get_parts(doc, ws, elem)
-        if not parts:
-            raise ValueError("No parts found in document.")
-        pid = parts[0]["partId"]
-
-        props = get_mass_props(doc, ws, elem, pid)
-        body  = props.get("bodies", {}).get(pid, {})
-
-        volume_array   = body.get("volume", [])
-        centroid_array = body.get("centroid", [])
-        mass_array     = body.get("mass", [])
-
-        if not volume_array or not centroid_array or not mass_array:
-            volume_array   = props.get("volume", [])
-            centroid_array = props.get("centroid", [])
-            mass_array     = props.get("mass", [])
-
-        volumes   = volume_array if isinstance(volume_array, list) else []
-        centroids = chunk_list(centroid_array, 3) if isinstance(centroid_array, list) else []
-
-        if not (volumes and centroids and mass_array):
-            raise ValueError("Mass-properties unavailable for this part.")
-
-        volume_mm3 = volumes[0] * 1e9
-        x_mm, y_mm, z_mm = [
-            0.0 if abs(c * 1000) < 1e-8 else c * 1000
-            for c in centroids[0]
-        ]
-        mass_g      = mass_array[0] * 1000
-        centroid_mm = [x_mm, y_mm, z_mm]
-
-        tolerance = 1e-4
-        ok = (
-            abs(volume_mm3 - SOLUTION["volume"]) < tolerance and
-            abs(mass_g     - SOLUTION["mass"])   < tolerance and
-            all(abs(c - s) < tolerance for c, s in zip(centroid_mm, SOLUTION["centroid"]))
-        )
-
-        if ok:
-            message = (
-                "<span style='color:green; font-size:20px;'>🎉 "
-                "Congratulations – perfect match!</span>"
-            )
-        else:
-            delta = (
-                f"Volume Δ: {volume_mm3 - SOLUTION['volume']:.6g} mm³, "
-                f"Mass Δ: {mass_g - SOLUTION['mass']:.6g} g, "
-                f"Centroid Δ: {[round(c - s, 6) for c, s in zip(centroid_mm, SOLUTION['centroid'])]}"
-            )
-            message = (
-                "<span style='color:red;'>❌ Mass-properties do not match.<br>"
-                + delta +
-                "</span>"
-            )
-
-    except Exception as exc:
-        message = f"<span style='color:red;'>Error: {exc}</span>"
+        name = request.form.get("name", "").strip()[:40] or None
+        job  = jobs.submit(grade_link, link, owner=participant_id(), meta={"name": name})
+    except QueueFull as exc:
+        return reject(str(exc), 503)
+
+    if wants_json():
+        return jsonify(job.to_dict()), 202
+    return redirect(url_for("index", job=job.id))
+
+
+@app.route('/regrade', methods=['POST'])
+def regrade():
+    """Re‑grade every stored submission against the current SOLUTION.
+
+    Submissions a pre‑check cut are checked again from what they stored; the
+    ones that pass now were never measured, so they go back on the grading
+    queue under their own id and acceptance time.
+    """
+    count, unmeasured = regrade_store(grader, store, PROBLEM)
+    queued = 0
+    for sid in unmeasured:
+        record = store.get_submission(sid)
+        try:
+            jobs.submit(grade_link, record["link"], owner=record["participant"],
+                        meta={"name": record["name"]}, job_id=sid,
+                        accepted_at=record["accepted_at"])
+        except QueueFull:
+            break
+        queued += 1
+    if wants_json():
+        return jsonify({"regraded": count, "requeued": queued, "not_queued": len(unmeasured) - queued})
+    text = f"Re-graded {count} submissions"
+    if unmeasured:
+        text += f", {queued} of {len(unmeasured)} earlier rejections queued for a full grading"
+    notify(text + ".")
+    return redirect(url_for('index'))
 
-    return redirect(url_for("index"))
+
+@app.route('/result/<job_id>', methods=['GET'])
+def result(job_id):
+    record = store.get_submission(job_id)
+    if record is None or record["participant"] != participant_id():
+        return jsonify({"error": "Unknown submission."}), 404
+    del record["participant"]
+    record["accepted_at"] = record["accepted_at"].isoformat() + "Z"
+    return jsonify(record)
+
+
+@app.route('/leaderboard', methods=['GET'])
+def leaderboard_page():
+    board = leaderboard.snapshot()
+    etag  = f"lb-{board['version']}-{'json' if wants_json() else 'html'}"
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+    if wants_json():
+        response = jsonify(board)
+    else:
+        with timed("render"):
+            response = app.make_response(render_template(LEADERBOARD_PAGE, board=board))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept")
+    return response
+
+
+@app.route('/contest', methods=['GET'])
+def contest_status():
+    return jsonify(contest_event(store.contest()))
+
+
+@app.route('/events', methods=['GET'])
+def events():
+    if not streaming_ok(request.environ):
+        return Response(status=204)                 # sync worker: the page polls instead
+    return Response(broadcaster.stream(participant_id()),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 # ────────────────────────────────────────────────────────────────
@@ -0,0 +1,291 @@
+"""
+Client‑side rate limiting for Onshape API calls.
+
+• Token bucket shared by every request made with one Onshape account – by
+  default across processes too: the bucket lives in a small SQLite file
+  (one per access key, in the temp folder), so the evaluator's gunicorn
+  workers, the viewer and the CLI tools together stay under the account
+  limit instead of each allowing ONSHAPE_RATE_LIMIT on its own.
+• Adaptive: a 429 halves the refill rate (and honours Retry‑After by pausing
+  the whole bucket); each successful call nudges it back up towards the
+  configured maximum – classic AIMD, so we hover just under the account limit.
+• Priority lanes: while a higher‑priority caller is waiting – in this process
+  or, with the shared bucket, in any other – lower lanes don't get tokens.
+  Contest grading > viewer pages > batch / CLI work.
+
+The lane is per thread: ``with lane(LANE_CONTEST): …`` or ``set_lane(…)`` for
+threads that only ever do one kind of work (e.g. as a pool initializer).
+
+Tuning (environment or .env):
+    ONSHAPE_RATE_LIMIT   max requests / second (default 10)
+    ONSHAPE_RATE_BURST   bucket size (default 20)
+    ONSHAPE_RATE_STATE   shared bucket file; "auto" = per access key in the temp
+                         folder (default), "off" = a private bucket per process
+                         (lanes then only order callers within one process)
+"""
+
+import hashlib, os, sqlite3, tempfile, threading, time
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+RATE_LIMIT = float(os.getenv("ONSHAPE_RATE_LIMIT", "10"))
+RATE_BURST = float(os.getenv("ONSHAPE_RATE_BURST", "20"))
+RATE_STATE = os.getenv("ONSHAPE_RATE_STATE", "auto")
+
+LANE_CONTEST = 0                                    # lower number = served first
+LANE_VIEWER  = 1
+LANE_BATCH   = 2
+
+_local = threading.local()
+
+
+def current_lane() -> int:
+    return getattr(_local, "lane", LANE_VIEWER)
+
+
+def set_lane(priority: int) -> None:
+    _local.lane = priority
+
+
+@contextmanager
+def lane(priority: int):
+    previous = current_lane()
+    set_lane(priority)
+    try:
+        yield
+    finally:
+        set_lane(previous)
+
+
+def shared_state_path(account: str, setting: str = RATE_STATE):
+    """Bucket file for ``account`` (an access key) per ONSHAPE_RATE_STATE, None = private."""
+    if setting in ("", "off"):
+        return None
+    if setting != "auto":
+        return setting
+    digest = hashlib.sha256(account.encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"onshape-rate-{digest}.db")
+
+
+class RateLimitTimeout(Exception):
+    """No token could be had before the caller's deadline."""
+
+
+class _LocalBucket:
+    """Bucket state for this process only."""
+
+    clock = staticmethod(time.monotonic)
+    poll  = float("inf")                            # notify_all() wakes waiters
+
+    def __init__(self, rate: float, burst: float):
+        self.tokens       = float(burst)
+        self.stamp        = time.monotonic()
+        self.rate         = rate
+        self.paused_until = 0.0
+
+    @contextmanager
+    def update(self):
+        yield self
+
+    def others_ahead(self, priority: int, now: float) -> bool:
+        return False
+
+    def publish(self, waiting: Counter) -> None:
+        pass
+
+
+class _SharedBucket:
+    """Bucket state in a SQLite file, shared by every process that opens it.
+
+    Each update is one BEGIN IMMEDIATE transaction.  Processes also list
+    which lanes they have callers waiting in, with a heartbeat, so lane
+    priority holds across processes; rows of a process that died go stale
+    after STALE seconds.  Nobody can wake a waiter in another process, so
+    waits are capped at ``poll`` seconds.
+    """
+
+    clock = staticmethod(time.time)                 # comparable across processes
+    poll  = 0.25
+    STALE = 2.0
+    IDLE  = 60.0                                    # untouched this long → start fresh
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bucket (
+            id           INTEGER PRIMARY KEY CHECK (id = 0),
+            tokens       REAL NOT NULL,
+            stamp        REAL NOT NULL,
+            rate         REAL NOT NULL,
+            paused_until REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS waiting (
+            pid  INTEGER NOT NULL,
+            lane INTEGER NOT NULL,
+            seen REAL NOT NULL,
+            PRIMARY KEY (pid, lane)
+        );
+    """
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.path     = path
+        self.max_rate = rate
+        self.burst    = burst
+        self._db      = None
+        self._pid     = None
+
+    def _conn(self) -> sqlite3.Connection:
+        # reopened after a fork (gunicorn --preload): connections don't survive it
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self._SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO bucket VALUES (0, ?, ?, ?, 0)",
+                         (self.burst, time.time(), self.max_rate))
+            self._db, self._pid = conn, os.getpid()
+        return self._db
+
+    @contextmanager
+    def update(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, stamp, rate, paused_until = conn.execute(
+                "SELECT tokens, stamp, rate, paused_until FROM bucket WHERE id = 0").fetchone()
+            now = time.time()
+            if now - stamp > self.IDLE and now >= paused_until:
+                tokens, rate = self.burst, self.max_rate
+            state = SimpleNamespace(tokens=tokens, stamp=stamp, paused_until=paused_until,
+                                    rate=min(rate, self.max_rate))
+            yield state
+            conn.execute("UPDATE bucket SET tokens = ?, stamp = ?, rate = ?, paused_until = ? "
+                         "WHERE id = 0", (state.tokens, state.stamp, state.rate, state.paused_until))
+            conn.execute("UPDATE waiting SET seen = ? WHERE pid = ?", (now, self._pid))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def others_ahead(self, priority: int, now: float) -> bool:
+        return self._conn().execute(
+            "SELECT 1 FROM waiting WHERE pid != ? AND lane < ? AND seen > ? LIMIT 1",
+            (self._pid, priority, now - self.STALE)).fetchone() is not None
+
+    def publish(self, waiting: Counter) -> None:
+        """Replace this process's row set with the lanes it has callers waiting in."""
+        conn = self._conn()
+        with self._transaction(conn):
+            conn.execute("DELETE FROM waiting WHERE pid = ? OR seen < ?",
+                         (self._pid, time.time() - self.STALE))
+            conn.executemany("INSERT INTO waiting VALUES (?, ?, ?)",
+                             [(self._pid, p, time.time()) for p, n in waiting.items() if n])
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+class RateLimiter:
+    def __init__(self, rate: float = RATE_LIMIT, burst: float = RATE_BURST,
+                 min_rate: float = None, shared: str = None):
+        """``shared``: SQLite file holding the bucket for every process that
+        uses it (see shared_state_path); None keeps the bucket in this process."""
+        self.max_rate  = rate
+        self.min_rate  = min_rate if min_rate is not None else max(rate / 20, 0.1)
+        self.burst     = burst
+        self.shared    = shared
+        self.granted   = 0                          # tokens this process got
+        self.throttled = 0                          # 429s this process saw
+        self._bucket   = _SharedBucket(shared, rate, burst) if shared else _LocalBucket(rate, burst)
+        self._waiting  = Counter()                  # lane → callers blocked in acquire()
+        self._cond     = threading.Condition()
+
+    def _refill(self, state, now: float) -> None:
+        state.tokens = min(self.burst, state.tokens + max(0.0, now - state.stamp) * state.rate)
+        state.stamp  = now
+
+    def _wait_in(self, priority: int, delta: int) -> None:
+        self._waiting[priority] += delta
+        # other processes only need to know when a lane starts or stops waiting
+        if self._waiting[priority] == (1 if delta > 0 else 0):
+            self._bucket.publish(self._waiting)
+
+    def acquire(self, priority: int = None, deadline: float = None) -> None:
+        """Block until a token is free for ``priority`` (default: the thread's lane).
+
+        ``deadline`` is a time.monotonic() value; past it RateLimitTimeout is raised.
+        """
+        if priority is None:
+            priority = current_lane()
+
+        with self._cond:
+            self._wait_in(priority, +1)
+            try:
+                while True:
+                    with self._bucket.update() as state:
+                        now = self._bucket.clock()
+                        self._refill(state, now)
+                        ahead  = any(n for p, n in self._waiting.items() if p < priority) \
+                            or self._bucket.others_ahead(priority, now)
+                        paused = now < state.paused_until
+
+                        if not paused and not ahead and state.tokens >= 1:
+                            state.tokens -= 1
+                            wait = 0.0
+                        elif paused:
+                            wait = state.paused_until - now
+                        elif state.tokens < 1:
+                            wait = (1 - state.tokens) / state.rate
+                        else:
+                            wait = 1 / state.rate   # let the higher lane go first
+                    if wait == 0.0:
+                        self.granted += 1
+                        return
+
+                    if deadline is not None:
+                        mono = time.monotonic()
+                        if mono >= deadline:
+                            raise RateLimitTimeout("Onshape rate limit – try again shortly.")
+                        wait = min(wait, deadline - mono)
+                    self._cond.wait(max(min(wait, self._bucket.poll), 0.001))
+            finally:
+                self._wait_in(priority, -1)
+                self._cond.notify_all()
+
+    def record(self, status: int, retry_after: float = None) -> None:
+        """Feed back the outcome of a request so the rate can adapt."""
+        with self._cond:
+            with self._bucket.update() as state:
+                now = self._bucket.clock()
+                self._refill(state, now)
+                if status == 429:
+                    state.rate   = max(self.min_rate, state.rate / 2)
+                    state.tokens = min(state.tokens, 0.0)
+                elif status < 500:
+                    state.rate = min(self.max_rate, state.rate + self.max_rate / 20)
+                if retry_after:
+                    state.paused_until = max(state.paused_until, now + retry_after)
+            if status == 429:
+                self.throttled += 1
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            with self._bucket.update() as state:
+                rate, paused_for = state.rate, max(0.0, state.paused_until - self._bucket.clock())
+            return {
+                "rate":      rate,
+                "max_rate":  self.max_rate,
+                "granted":   self.granted,
+                "throttled": self.throttled,
+                "paused_for": paused_for,
+                "waiting":   {p: n for p, n in self._waiting.items() if n},
+            }
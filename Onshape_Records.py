@@ -0,0 +1,120 @@
+"""
+Compact records for the parts of Onshape responses this project reads.
+
+A part list carries appearance, material and configuration metadata for
+every part, and a mass‑properties reply carries inertia tensors, principal
+axes and periphery data – we use the part id, the name, the first volume /
+mass / centroid value and the six corners of a bounding box.  The selectors
+here turn a decoded reply into __slots__ records straight away, so the full
+dict is garbage the moment the request is done and the response cache only
+ever holds the records.
+
+Decoding uses orjson when it is installed (``pip install orjson``, optional)
+and the standard library otherwise.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:                                     # optional fast backend
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(payload: bytes):
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+class PartRef:
+    __slots__ = ("part_id", "name")
+
+    def __init__(self, part_id: str, name: str):
+        self.part_id = part_id
+        self.name    = name
+
+    def __repr__(self):
+        return f"PartRef({self.part_id!r}, {self.name!r})"
+
+
+class MassProps:
+    """One part's mass properties in Onshape's SI units (m³, kg, m)."""
+
+    __slots__ = ("part_id", "volume", "mass", "centroid")
+
+    def __init__(self, part_id, volume: float, mass: float, centroid: tuple):
+        self.part_id  = part_id
+        self.volume   = volume
+        self.mass     = mass
+        self.centroid = centroid
+
+    def mm(self) -> tuple:
+        """``(volume mm³, mass g, [x, y, z] mm)``; near‑zero coordinates snap to 0."""
+        return (
+            self.volume * 1e9,
+            self.mass * 1000,
+            [0.0 if abs(c * 1000) < 1e-8 else c * 1000 for c in self.centroid],
+        )
+
+    def __repr__(self):
+        return f"MassProps({self.part_id!r}, {self.volume!r}, {self.mass!r}, {self.centroid!r})"
+
+
+class BoundingBox:
+    """Axis‑aligned box in metres, as Onshape reports it (may be slightly loose)."""
+
+    __slots__ = ("low", "high")
+
+    def __init__(self, low: tuple, high: tuple):
+        self.low  = low
+        self.high = high
+
+    def mm(self) -> tuple:
+        """``([x, y, z] low mm, [x, y, z] high mm)``."""
+        return [c * 1000 for c in self.low], [c * 1000 for c in self.high]
+
+    def __repr__(self):
+        return f"BoundingBox({self.low!r}, {self.high!r})"
+
+
+def _mass_props(part_id, entry: dict):
+    """MassProps from one ``{"volume": [...], "mass": [...], "centroid": [...]}`` entry, or None."""
+    volume, mass, centroid = entry.get("volume"), entry.get("mass"), entry.get("centroid")
+    if not (isinstance(volume, list) and volume and isinstance(mass, list) and mass
+            and isinstance(centroid, list) and len(centroid) >= 3):
+        return None
+    return MassProps(part_id, volume[0], mass[0], tuple(centroid[:3]))
+
+
+# selectors: decoded reply → what callers keep (also what gets cached) ------
+
+def select_parts(data) -> list:
+    """/parts reply → ``[PartRef, ...]``."""
+    return [PartRef(part.get("partId"), part.get("name")) for part in data]
+
+
+def select_bodies(data) -> dict:
+    """massproperties reply → ``{partId: MassProps}``.
+
+    The top‑level (flattened) arrays, when complete, are kept under the key
+    None – a single‑part reply sometimes has only those.
+    """
+    bodies = {}
+    for part_id, body in (data.get("bodies") or {}).items():
+        props = _mass_props(part_id, body)
+        if props is not None:
+            bodies[part_id] = props
+    flattened = _mass_props(None, data)
+    if flattened is not None:
+        bodies[None] = flattened
+    return bodies
+
+
+def select_bbox(data):
+    """boundingboxes reply → BoundingBox, or None if a corner is missing."""
+    try:
+        return BoundingBox((data["lowX"], data["lowY"], data["lowZ"]),
+                           (data["highX"], data["highY"], data["highZ"]))
+    except (KeyError, TypeError):
+        return None